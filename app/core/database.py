@@ -1,10 +1,21 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON
+from sqlalchemy import create_engine, delete, inspect, select, text, update, Column, Integer, String, Text, DateTime, Boolean, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, deferred, sessionmaker
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
+from functools import lru_cache
+import base64
 import os
+import orjson
 from dotenv import load_dotenv
 
+from .urls import normalize_store_url
+
+try:
+    import zstandard
+except ImportError:  # without zstd, new values are stored uncompressed
+    zstandard = None
+
 load_dotenv()
 
 # Database configuration - use combined URL if available, otherwise build from components
@@ -19,10 +30,64 @@ if not DATABASE_URL:
     MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "shopify_insights")
     DATABASE_URL = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
 
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# JSON values whose serialized size reaches this are stored zstd-compressed
+COMPRESS_MIN_BYTES = int(os.getenv("DB_COMPRESS_MIN_BYTES", "2048"))
+DB_ZSTD_LEVEL = int(os.getenv("DB_ZSTD_LEVEL", "6"))
+
+# Bound to the engine by get_engine(); use new_session() or get_db() to open sessions
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
+@lru_cache(maxsize=None)
+def get_engine():
+    """Create the shared engine on first use, so importing this module never loads a DB driver"""
+    engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+def new_session() -> Session:
+    get_engine()
+    return SessionLocal()
+
+def __getattr__(name):
+    # Backwards compatible `from app.core.database import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON column whose large values are stored as {"__zstd__": <base64 zstd of
+    the JSON>}. The column stays plain JSON, so no migration is needed: rows
+    written before compression (or below COMPRESS_MIN_BYTES) read back as-is
+    and are compressed the next time they are saved.
+    """
+    impl = JSON
+    cache_ok = True
+
+    ENVELOPE_KEY = "__zstd__"
+
+    def process_bind_param(self, value, dialect):
+        if value is None or zstandard is None:
+            return value
+        payload = orjson.dumps(value)
+        if len(payload) < COMPRESS_MIN_BYTES:
+            return value
+        compressed = zstandard.ZstdCompressor(level=DB_ZSTD_LEVEL).compress(payload)
+        return {self.ENVELOPE_KEY: base64.b64encode(compressed).decode("ascii")}
+
+    def process_result_value(self, value, dialect):
+        if not (isinstance(value, dict) and len(value) == 1 and self.ENVELOPE_KEY in value):
+            return value
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read compressed database values")
+        payload = zstandard.ZstdDecompressor().decompress(base64.b64decode(value[self.ENVELOPE_KEY]))
+        return orjson.loads(payload)
+
+# Deferred column group holding the large fields; loaded (and decompressed)
+# only when one of them is accessed, or eagerly with undefer_group(BLOB_GROUP)
+BLOB_GROUP = "blobs"
+
 class BrandInsightsDB(Base):
     __tablename__ = "brand_insights"
     
@@ -30,19 +95,22 @@ class BrandInsightsDB(Base):
     store_url = Column(String(500), unique=True, index=True)
     store_name = Column(String(255))
     brand_context = Column(JSON)
-    product_catalog = Column(JSON)
-    hero_products = Column(JSON)
+    product_catalog = deferred(Column(CompressedJSON), group=BLOB_GROUP)
+    hero_products = deferred(Column(CompressedJSON), group=BLOB_GROUP)
     total_products = Column(Integer, default=0)
-    privacy_policy = Column(JSON)
-    return_policy = Column(JSON)
-    refund_policy = Column(JSON)
-    shipping_policy = Column(JSON)
-    terms_of_service = Column(JSON)
-    faqs = Column(JSON)
+    privacy_policy = deferred(Column(CompressedJSON), group=BLOB_GROUP)
+    return_policy = deferred(Column(CompressedJSON), group=BLOB_GROUP)
+    refund_policy = deferred(Column(CompressedJSON), group=BLOB_GROUP)
+    shipping_policy = deferred(Column(CompressedJSON), group=BLOB_GROUP)
+    terms_of_service = deferred(Column(CompressedJSON), group=BLOB_GROUP)
+    faqs = deferred(Column(CompressedJSON), group=BLOB_GROUP)
     contact_info = Column(JSON)
     social_handles = Column(JSON)
     important_links = Column(JSON)
-    scraped_at = Column(DateTime, default=datetime.utcnow)
+    scraped_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Bumped by every save, including sitemap syncs that keep scraped_at;
+    # incremental exports filter on it. Added to existing tables by migrate_tables.
+    updated_at = Column(DateTime, default=datetime.now, index=True)
     scraping_success = Column(Boolean, default=True)
     errors = Column(JSON)
     
@@ -51,17 +119,104 @@ class CompetitorAnalysisDB(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     main_brand_url = Column(String(500), index=True)
-    competitors = Column(JSON)
+    competitors = deferred(Column(CompressedJSON), group=BLOB_GROUP)
     analysis_summary = Column(Text)
     competitive_advantages = Column(JSON)
     market_insights = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class StoreLeaseDB(Base):
+    __tablename__ = "store_leases"
+
+    # One row per store: a queued batch item, a scrape in progress (running,
+    # kept alive by heartbeats) or a recently finished one (done/failed)
+    store_url = Column(String(500), primary_key=True)
+    status = Column(String(20), index=True, default="pending")
+    owner = Column(String(255), index=True)
+    # Incremented on every claim, so a node that lost its lease cannot complete it
+    token = Column(Integer, default=0)
+    claimed_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+def migrate_tables():
+    """
+    Bring tables created by older versions up to date, which create_all does
+    not do. Adds columns introduced later; equivalent SQL for a manual migration:
+
+        ALTER TABLE brand_insights ADD COLUMN updated_at DATETIME;
+        UPDATE brand_insights SET updated_at = scraped_at;
+        CREATE INDEX ix_brand_insights_updated_at ON brand_insights (updated_at);
+
+    Then normalizes stored store URLs (normalize_stored_urls).
+    """
+    engine = get_engine()
+    columns = {column["name"] for column in inspect(engine).get_columns(BrandInsightsDB.__tablename__)}
+    if "updated_at" not in columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE brand_insights ADD COLUMN updated_at DATETIME"))
+            connection.execute(text("UPDATE brand_insights SET updated_at = scraped_at"))
+        for index in BrandInsightsDB.__table__.indexes:
+            if "updated_at" in index.columns:
+                index.create(bind=engine)
+        print("✅ Added brand_insights.updated_at")
+
+    normalize_stored_urls()
+
+def normalize_stored_urls():
+    """
+    Rewrite store URLs saved before they were normalized (e.g. with a
+    trailing slash) to normalize_store_url form, which lookups use.
+
+    Rows of one store saved under several forms are merged into the most
+    recently saved one. Only the URL and timestamp columns are read, and
+    nothing is written once every URL is normalized.
+    """
+    insights = BrandInsightsDB.__table__
+    analyses = CompetitorAnalysisDB.__table__
+
+    with get_engine().begin() as connection:
+        stores = {}
+        for row in connection.execute(
+            select(insights.c.id, insights.c.store_url, insights.c.updated_at, insights.c.scraped_at)
+        ):
+            if row.store_url:
+                stores.setdefault(normalize_store_url(row.store_url), []).append(row)
+
+        renamed = merged = 0
+        for store_url, rows in stores.items():
+            if len(rows) == 1 and rows[0].store_url == store_url:
+                continue
+            rows.sort(key=lambda row: (row.updated_at or row.scraped_at or datetime.min, row.id), reverse=True)
+            stale = [row.id for row in rows[1:]]
+            if stale:
+                connection.execute(delete(insights).where(insights.c.id.in_(stale)))
+                merged += len(stale)
+            if rows[0].store_url != store_url:
+                connection.execute(update(insights).where(insights.c.id == rows[0].id).values(store_url=store_url))
+                renamed += 1
+
+        # Analyses are history, several per store is expected; only the URL changes
+        analysis_urls = connection.execute(select(analyses.c.main_brand_url).distinct()).scalars()
+        for main_brand_url in list(analysis_urls):
+            if main_brand_url and normalize_store_url(main_brand_url) != main_brand_url:
+                connection.execute(
+                    update(analyses)
+                    .where(analyses.c.main_brand_url == main_brand_url)
+                    .values(main_brand_url=normalize_store_url(main_brand_url))
+                )
+                renamed += 1
+
+    if renamed or merged:
+        print(f"✅ Normalized {renamed} stored store URLs, merged {merged} duplicate rows")
+
 def create_tables():
     """Create database tables if they don't exist"""
     try:
         # Create all tables
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
+        migrate_tables()
         print("✅ Database tables created successfully!")
         return True
     except Exception as e:
@@ -72,7 +227,7 @@ def test_connection():
     """Test database connection"""
     try:
         # Test connection by executing a simple query
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             from sqlalchemy import text
             connection.execute(text("SELECT 1"))
         return True
@@ -82,7 +237,7 @@ def test_connection():
 
 def get_db():
     """Get database session"""
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
@@ -98,23 +253,13 @@ def init_db():
         
         print("Database connection successful!")
         
-        # Check if tables exist by trying to query one
-        try:
-            with engine.connect() as connection:
-                from sqlalchemy import text
-                result = connection.execute(text("SELECT COUNT(*) FROM brand_insights LIMIT 1"))
-                print("Database tables already exist and are accessible.")
-                return True
-        except Exception:
-            # Tables don't exist, create them
-            print("Creating database tables...")
-            if create_tables():
-                print("Database tables created successfully!")
-                return True
-            else:
-                print("Failed to create database tables.")
-                return False
-                
+        # create_all only creates missing tables, so tables added in later
+        # versions (e.g. store_leases) appear on existing databases too
+        if create_tables():
+            return True
+        print("Failed to create database tables.")
+        return False
+
     except Exception as e:
         print(f"Database initialization failed: {e}")
         return False
@@ -1,11 +1,11 @@
 import os
 import sys
 from sqlalchemy import inspect
-from .database import engine, Base, init_db
+from .database import get_engine, Base, init_db
 
 def check_tables_exist():
     """Check if the required tables exist in the database"""
-    inspector = inspect(engine)
+    inspector = inspect(get_engine())
     existing_tables = inspector.get_table_names()
     
     required_tables = ['brand_insights', 'competitor_analysis']
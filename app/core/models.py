@@ -16,6 +16,8 @@ class Product(BaseModel):
     variants: List[Dict[str, Any]] = []
     available: bool = True
     url: Optional[str] = None
+    # Shopify's updated_at, compared with sitemap <lastmod> for delta syncs
+    updated_at: Optional[str] = None
 
 class FAQ(BaseModel):
     question: str
@@ -84,17 +86,88 @@ class BrandInsights(BaseModel):
     scraping_success: bool = True
     errors: List[str] = []
 
+class ShareEntry(BaseModel):
+    name: str
+    count: int
+    share: float
+
+class PriceStats(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    p10: Optional[float] = None
+    p25: Optional[float] = None
+    median: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
+
+class DiscountStats(BaseModel):
+    # Share of priced products with compare_at_price above price
+    share: float = 0.0
+    # Fractional discount (1 - price / compare_at_price) over discounted products
+    mean_depth: Optional[float] = None
+    median_depth: Optional[float] = None
+    max_depth: Optional[float] = None
+
+class CatalogStats(BaseModel):
+    store_url: str
+    catalog_size: int = 0
+    priced_products: int = 0
+    price: PriceStats = PriceStats()
+    discount: DiscountStats = DiscountStats()
+    availability_rate: Optional[float] = None
+    mean_variants: Optional[float] = None
+    product_types: List[ShareEntry] = []
+    vendors: List[ShareEntry] = []
+
+class ProductMatch(BaseModel):
+    competitor_url: str
+    main_handle: str
+    main_title: str
+    main_price: Optional[float] = None
+    competitor_handle: str
+    competitor_title: str
+    competitor_price: Optional[float] = None
+    # Jaccard similarity of title words, tags and product type
+    similarity: float
+    # Competitor price minus main brand price
+    price_delta: Optional[float] = None
+    price_delta_pct: Optional[float] = None
+
 class CompetitorAnalysis(BaseModel):
     main_brand: BrandInsights
     competitors: List[BrandInsights] = []
     analysis_summary: Optional[str] = None
     competitive_advantages: List[str] = []
     market_insights: List[str] = []
+    product_matches: List[ProductMatch] = []
 
 class ScrapingRequest(BaseModel):
     website_url: HttpUrl
     include_competitor_analysis: bool = False
     max_competitors: int = Field(default=3, ge=1, le=10)
+    # Serve stored insights up to this many seconds old instead of scraping live
+    max_age: Optional[int] = Field(default=None, ge=0)
+    # Past max_age, stored insights up to this many extra seconds old are still
+    # served immediately while a background refresh runs
+    stale_while_revalidate: int = Field(default=0, ge=0)
+
+class SyncRequest(BaseModel):
+    website_url: HttpUrl
+
+class BatchRequest(BaseModel):
+    store_urls: List[HttpUrl] = Field(min_length=1, max_length=1000)
+
+class SyncResponse(BaseModel):
+    success: bool
+    store_url: str
+    message: str
+    total_products: int = 0
+    added: List[str] = []
+    updated: List[str] = []
+    deleted: List[str] = []
+    unchanged: int = 0
+    processing_time: Optional[float] = None
 
 class ScrapingResponse(BaseModel):
     success: bool
@@ -103,3 +176,8 @@ class ScrapingResponse(BaseModel):
     message: str
     processing_time: Optional[float] = None
     errors: List[str] = []
+    # Where the data came from: "live", "memory" or "database"
+    source: str = "live"
+    # Seconds since the data was scraped
+    age: Optional[float] = None
+    stale: bool = False
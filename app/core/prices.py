@@ -0,0 +1,9 @@
+from typing import Any, Optional
+
+
+def parse_price(value: Any, default: Optional[float] = None) -> Optional[float]:
+    """Price as a float; Shopify sends strings like "19.99". default when missing or not numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
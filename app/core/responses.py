@@ -0,0 +1,77 @@
+import os
+from typing import Any, Iterator, List, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+# Responses whose product catalog is larger than this are streamed in chunks
+STREAM_THRESHOLD = int(os.getenv("RESPONSE_STREAM_THRESHOLD", "1000"))
+STREAM_CHUNK_SIZE = int(os.getenv("RESPONSE_STREAM_CHUNK_SIZE", "250"))
+
+_CATALOG_PLACEHOLDER = "__product_catalog_stream__"
+
+
+def _default(obj: Any):
+    """Fallback encoder for types orjson does not handle natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if hasattr(obj, "__table__"):
+        # SQLAlchemy row
+        return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, skipping FastAPI's jsonable_encoder pass"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def iter_catalog_json(envelope: dict, catalog: List[BaseModel], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Serialize an envelope whose `data.product_catalog` is emitted in chunks.
+
+    The envelope must already have its catalog replaced by the placeholder so
+    the full product list is never rendered into a single buffer.
+    """
+    head, tail = dumps(envelope).split(orjson.dumps(_CATALOG_PLACEHOLDER), 1)
+    yield head + b"["
+    for start in range(0, len(catalog), chunk_size):
+        chunk = b",".join(dumps(product) for product in catalog[start:start + chunk_size])
+        yield (b"," + chunk) if start else chunk
+    yield b"]" + tail
+
+
+def catalog_response(response: BaseModel, status_code: int = 200, headers: Optional[dict] = None):
+    """
+    Render a response carrying a BrandInsights under `data`.
+
+    Small payloads are rendered in one pass with orjson; large catalogs are
+    streamed so serialization cost is spread across chunks.
+    """
+    data = getattr(response, "data", None)
+    catalog = getattr(data, "product_catalog", None) or []
+
+    if len(catalog) <= STREAM_THRESHOLD:
+        return ORJSONResponse(content=response, status_code=status_code, headers=headers)
+
+    envelope = response.model_dump(exclude={"data": {"product_catalog"}})
+    envelope["data"]["product_catalog"] = _CATALOG_PLACEHOLDER
+    return StreamingResponse(
+        iter_catalog_json(envelope, catalog),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Encode a single server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
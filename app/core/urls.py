@@ -0,0 +1,67 @@
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that never change page content
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "_pos", "_sid", "_ss", "variant"}
+
+
+def normalize_store_url(url: str) -> str:
+    """
+    Canonical form of a store URL, used as the identity of a store.
+
+    Adds a missing scheme, lowercases scheme and host, drops default ports,
+    query strings, fragments and trailing slashes.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+
+    parsed = urlsplit(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+
+    return urlunsplit((scheme, host, parsed.path.rstrip("/"), "", ""))
+
+
+def canonicalize_url(url: str, base_url: Optional[str] = None) -> Optional[str]:
+    """
+    Canonical form of a page URL for crawl dedup, or None for non-HTTP links.
+
+    Resolves against base_url, lowercases scheme and host, drops default ports,
+    fragments and tracking parameters, sorts the remaining query and collapses
+    duplicate and trailing slashes.
+    """
+    if base_url:
+        url = urljoin(base_url, url)
+
+    parsed = urlsplit(url.strip())
+    scheme = parsed.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parsed.hostname:
+        return None
+
+    host = parsed.hostname.lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parsed.port}"
+
+    path = re.sub(r"/{2,}", "/", parsed.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith("utm_")
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def same_site(url: str, other: str) -> bool:
+    """True when both URLs are on the same host, ignoring a leading www."""
+    def host(value):
+        name = (urlsplit(value).hostname or "").lower()
+        return name[4:] if name.startswith("www.") else name
+    return host(url) == host(other)
@@ -1,19 +1,226 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from sqlalchemy.orm import Session, undefer_group
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Literal, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
 import time
 
-from ..core.models import ScrapingRequest, ScrapingResponse, BrandInsights, CompetitorAnalysis
-from ..services.shopify_scraper import ShopifyScraper
-from ..services.gemini_service import GeminiService
-from ..core.database import get_db, BrandInsightsDB, CompetitorAnalysisDB
+from ..core.models import ScrapingRequest, ScrapingResponse, SyncRequest, SyncResponse, BatchRequest, BrandInsights, CompetitorAnalysis
+from ..core.responses import ORJSONResponse, catalog_response, sse_event
+from ..core.urls import normalize_store_url
+from ..services.shopify_scraper import get_scraper
+from ..services.gemini_service import get_gemini_service
+from ..services.single_flight import SingleFlight
+from ..services.sitemap_sync import SitemapSync
+from ..services.catalog_analytics import brand_summary, compute_catalog_stats
+from ..services.search_index import get_search_index
+from ..services.product_matching import get_product_index
+from ..services.export import EXPORT_FORMATS, export_insights, parquet_available
+from ..services.leases import get_lease_manager
+from ..core.database import get_db, new_session, BLOB_GROUP, BrandInsightsDB, CompetitorAnalysisDB
+from ..services.insights_cache import InsightsCache, insights_age
 
 router = APIRouter()
 
-# Initialize services
-scraper = ShopifyScraper()
-gemini_service = GeminiService()
+# Concurrent scrapes of the same store share one pipeline run
+scrape_flight = SingleFlight(memo_seconds=float(os.getenv("SCRAPE_MEMO_SECONDS", "10")))
 
-@router.post("/scrape", response_model=ScrapingResponse)
+# Most recent insights per store, consulted before the database
+insights_cache = InsightsCache(max_entries=int(os.getenv("INSIGHTS_CACHE_SIZE", "256")))
+
+# Search and product-match indexing of saved stores, off the request and
+# lease path; one worker so FTS writes never contend with each other
+index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indexer")
+
+# BrandInsights fields carried by each streamed section
+STREAM_SECTIONS = {
+    "store_url": ["store_url"],
+    "store_name": ["store_name"],
+    "products": ["product_catalog", "total_products"],
+    "hero_products": ["hero_products"],
+    "important_links": ["important_links"],
+    "policies": ["privacy_policy", "return_policy", "refund_policy", "shipping_policy", "terms_of_service"],
+    "brand_context": ["brand_context"],
+    "faqs": ["faqs"],
+    "contact_info": ["contact_info"],
+    "social_handles": ["social_handles"],
+}
+
+def scrape_and_index(
+    store_url: str,
+    on_section: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> BrandInsights:
+    """
+    Scrape a store under its cross-node lease and persist the result.
+
+    If another node is already scraping the store, wait for it and serve what
+    it stored instead of scraping again; on_section is then never called.
+    The row is saved before the lease is released so waiting nodes find it;
+    indexing is queued once the lease is released.
+    """
+    leases = get_lease_manager()
+    try:
+        claimed = leases.claim(store_url, include_done=True)
+        if not claimed:
+            waited_from = datetime.now()
+            if leases.wait_until_free(store_url):
+                peer_insights = load_insights_since(store_url, waited_from)
+                if peer_insights is not None:
+                    return peer_insights
+            claimed = leases.claim(store_url, include_done=True)
+    except Exception as e:
+        # Coordination is best effort; never fail a scrape because of it
+        print(f"Error claiming lease on {store_url}: {e}")
+        claimed = False
+
+    brand_insights = None
+    try:
+        brand_insights = get_scraper().scrape_store(store_url, on_section)
+        persist_insights(brand_insights)
+        return brand_insights
+    finally:
+        if claimed:
+            try:
+                leases.complete(store_url, bool(brand_insights and brand_insights.scraping_success))
+            except Exception as e:
+                print(f"Error completing lease on {store_url}: {e}")
+        if brand_insights is not None and brand_insights.scraping_success:
+            index_in_background(brand_insights)
+
+def persist_insights(brand_insights: BrandInsights):
+    """Save a successful scrape's row; indexing is left to index_in_background"""
+    if not brand_insights.scraping_success:
+        return
+    db = new_session()
+    try:
+        save_brand_insights(brand_insights, db)
+    finally:
+        db.close()
+
+def index_brand_insights(brand_insights: BrandInsights):
+    """Update the product search index and the cross-store matching index for a store"""
+    try:
+        stats = get_search_index().index_store(brand_insights.store_url, brand_insights.product_catalog)
+        print(f"Indexed products for {brand_insights.store_url}: {stats}")
+    except Exception as e:
+        print(f"Error indexing products: {e}")
+
+    try:
+        get_product_index().add_store(brand_insights.store_url, brand_insights.product_catalog)
+    except Exception as e:
+        print(f"Error updating product match index: {e}")
+
+def index_in_background(brand_insights: BrandInsights):
+    index_executor.submit(index_brand_insights, brand_insights)
+
+def process_queued_store(store_url: str) -> bool:
+    """Batch worker task; the worker already holds the store's lease"""
+    brand_insights = get_scraper().scrape_store(store_url)
+    persist_insights(brand_insights)
+    if brand_insights.scraping_success:
+        insights_cache.put(store_url, brand_insights)
+        index_in_background(brand_insights)
+    return brand_insights.scraping_success
+
+async def scrape_coalesced(store_url: str) -> BrandInsights:
+    """Scrape a store, attaching to an in-flight scrape of the same URL if there is one"""
+    store_url = normalize_store_url(store_url)
+    brand_insights = await scrape_flight.run(
+        store_url,
+        scrape_and_index,
+        store_url,
+        memoize=lambda insights: insights.scraping_success,
+        feed=True
+    )
+    if brand_insights.scraping_success:
+        insights_cache.put(store_url, brand_insights)
+    return brand_insights
+
+def insights_from_row(row: BrandInsightsDB) -> BrandInsights:
+    fields = {
+        column.name: getattr(row, column.name)
+        for column in BrandInsightsDB.__table__.columns
+        if column.name not in ("id", "updated_at") and getattr(row, column.name) is not None
+    }
+    return BrandInsights(**fields)
+
+def load_saved_insights(store_url: str, db: Session) -> Optional[BrandInsights]:
+    """The store's successful insights as saved in the database, bypassing the cache"""
+    row = db.query(BrandInsightsDB).options(undefer_group(BLOB_GROUP)).filter(
+        BrandInsightsDB.store_url == store_url
+    ).first()
+    if not row or not row.scraping_success:
+        return None
+    return insights_from_row(row)
+
+def load_stored_insights(store_url: str, db: Session):
+    """Return (insights, source) from the in-memory cache or the database, or (None, None)"""
+    brand_insights = insights_cache.get(store_url)
+    if brand_insights is not None:
+        return brand_insights, "memory"
+
+    brand_insights = load_saved_insights(store_url, db)
+    if brand_insights is None:
+        return None, None
+    insights_cache.put(store_url, brand_insights)
+    return brand_insights, "database"
+
+def load_insights_since(store_url: str, since: datetime) -> Optional[BrandInsights]:
+    """Successful insights stored for a store at or after `since`, e.g. by another node"""
+    db = new_session()
+    try:
+        row = db.query(BrandInsightsDB).options(undefer_group(BLOB_GROUP)).filter(
+            BrandInsightsDB.store_url == store_url,
+            BrandInsightsDB.scraped_at >= since,
+            BrandInsightsDB.scraping_success.is_(True)
+        ).first()
+        return insights_from_row(row) if row else None
+    finally:
+        db.close()
+
+async def load_fresh_insights(
+    request: ScrapingRequest,
+    store_url: str,
+    db: Session,
+    background_tasks: BackgroundTasks
+):
+    """
+    Stored insights the request accepts under max_age and
+    stale_while_revalidate, as (insights, source, age, stale); None when it
+    has to be scraped live. Serving a stale copy schedules a refresh.
+    """
+    if request.max_age is None:
+        return None
+    try:
+        stored, source = await run_in_threadpool(load_stored_insights, store_url, db)
+    except Exception as e:
+        # The app runs without database persistence; scrape live instead
+        print(f"Error loading stored insights for {store_url}: {e}")
+        return None
+    if stored is None:
+        return None
+
+    age = insights_age(stored)
+    if age > request.max_age + request.stale_while_revalidate:
+        return None
+    stale = age > request.max_age
+    if stale:
+        background_tasks.add_task(refresh_store_insights, store_url)
+    return stored, source, round(age, 2), stale
+
+async def refresh_store_insights(store_url: str):
+    """Background revalidation of a stale store; concurrent refreshes share one scrape"""
+    try:
+        # Saved as part of the scrape
+        await scrape_coalesced(store_url)
+    except Exception as e:
+        print(f"Error refreshing insights for {store_url}: {e}")
+
+@router.post("/scrape", response_model=ScrapingResponse, response_class=ORJSONResponse)
 async def scrape_store(
     request: ScrapingRequest,
     background_tasks: BackgroundTasks,
@@ -26,23 +233,35 @@ async def scrape_store(
         
         if not store_url.startswith(('http://', 'https://')):
             raise HTTPException(status_code=400, detail="Invalid URL format")
+        store_url = normalize_store_url(store_url)
+
+        brand_insights, source, age, stale = None, "live", None, False
+
+        stored = await load_fresh_insights(request, store_url, db, background_tasks)
+        if stored is not None:
+            brand_insights, source, age, stale = stored
+
+        if brand_insights is None:
+            brand_insights = await scrape_coalesced(store_url)
+            # May be a memoized result or one stored by another node
+            age = round(insights_age(brand_insights), 2)
         
-        brand_insights = scraper.scrape_store(store_url)
-        
-        if not brand_insights.scraping_success:
-            if "not appear to be a Shopify store" in str(brand_insights.errors):
-                raise HTTPException(status_code=401, detail="Website not found or not a Shopify store")
-            else:
-                raise HTTPException(status_code=500, detail=f"Scraping failed: {'; '.join(brand_insights.errors)}")
-        
-        background_tasks.add_task(save_brand_insights, brand_insights, db)
+            if not brand_insights.scraping_success:
+                if "not appear to be a Shopify store" in str(brand_insights.errors):
+                    raise HTTPException(status_code=401, detail="Website not found or not a Shopify store")
+                else:
+                    raise HTTPException(status_code=500, detail=f"Scraping failed: {'; '.join(brand_insights.errors)}")
         
         response_data = {
             "success": True,
             "data": brand_insights,
-            "message": "Store insights scraped successfully",
+            "message": "Store insights scraped successfully" if source == "live" else "Stored insights served",
             "processing_time": round(time.time() - start_time, 2),
-            "errors": brand_insights.errors
+            # Copied: the insights object may be shared with other callers
+            "errors": list(brand_insights.errors),
+            "source": source,
+            "age": age,
+            "stale": stale
         }
         
         if request.include_competitor_analysis:
@@ -57,7 +276,186 @@ async def scrape_store(
             except Exception as e:
                 response_data["errors"].append(f"Competitor analysis failed: {e}")
 
-        return ScrapingResponse(**response_data)
+        return catalog_response(
+            ScrapingResponse(**response_data),
+            headers={"Age": str(int(age)), "X-Insights-Source": source}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@router.post("/scrape/stream")
+async def stream_scrape_store(
+    request: ScrapingRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent-events variant of /scrape.
+
+    Emits one event per BrandInsights section as soon as it is ready, an
+    optional competitor_analysis event, then a final "complete" envelope.
+    Failures are reported as an "error" event carrying a status code.
+    max_age and stale_while_revalidate work as in /scrape; stored insights
+    are sent as all sections at once.
+    """
+    store_url = str(request.website_url)
+
+    if not store_url.startswith(('http://', 'https://')):
+        raise HTTPException(status_code=400, detail="Invalid URL format")
+    store_url = normalize_store_url(store_url)
+
+    return StreamingResponse(
+        _iter_scrape_events(request, store_url, background_tasks, db),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _iter_scrape_events(
+    request: ScrapingRequest,
+    store_url: str,
+    background_tasks: BackgroundTasks,
+    db: Session
+):
+    start_time = time.time()
+    emitted = set()
+
+    stored = await load_fresh_insights(request, store_url, db, background_tasks)
+    if stored is not None:
+        brand_insights, source, age, stale = stored
+    else:
+        source, stale = "live", False
+        # Attach to the same coalesced scrape as /scrape and relay its sections,
+        # replaying those published before this request arrived
+        feed = scrape_flight.feed(store_url)
+        scrape = asyncio.ensure_future(scrape_coalesced(store_url))
+
+        try:
+            async for section, section_fields in feed.follow(scrape):
+                emitted.add(section)
+                if section != "status":
+                    yield sse_event(section, section_fields)
+
+            brand_insights = await scrape
+        except Exception as e:
+            yield sse_event("error", {"status_code": 500, "detail": f"An unexpected error occurred: {str(e)}"})
+            return
+        finally:
+            if not scrape.done():
+                scrape.cancel()
+
+        if not brand_insights.scraping_success:
+            if "not appear to be a Shopify store" in str(brand_insights.errors):
+                yield sse_event("error", {"status_code": 401, "detail": "Website not found or not a Shopify store"})
+            else:
+                yield sse_event("error", {"status_code": 500, "detail": f"Scraping failed: {'; '.join(brand_insights.errors)}"})
+            return
+        age = round(insights_age(brand_insights), 2)
+
+    # Stored and memoized insights, and those stored by another node, arrive
+    # whole; send the sections not seen yet
+    for section, names in STREAM_SECTIONS.items():
+        if section not in emitted:
+            section_fields = {name: getattr(brand_insights, name) for name in names}
+            if section == "policies":
+                section_fields = {name: value for name, value in section_fields.items() if value is not None}
+            yield sse_event(section, section_fields)
+
+    errors = list(brand_insights.errors)
+
+    if request.include_competitor_analysis:
+        try:
+            competitor_analysis = await analyze_competitors(
+                brand_insights,
+                request.max_competitors,
+                background_tasks,
+                db
+            )
+            yield sse_event("competitor_analysis", {"competitor_analysis": competitor_analysis})
+        except Exception as e:
+            errors.append(f"Competitor analysis failed: {e}")
+
+    yield sse_event("complete", {
+        "success": True,
+        "message": "Store insights scraped successfully" if source == "live" else "Stored insights served",
+        "processing_time": round(time.time() - start_time, 2),
+        "errors": errors,
+        "source": source,
+        "age": age,
+        "stale": stale
+    })
+
+@router.post("/sync", response_model=SyncResponse, response_class=ORJSONResponse)
+async def sync_store_products(request: SyncRequest, db: Session = Depends(get_db)):
+    """
+    Delta-sync a stored catalog from the store's product sitemaps.
+
+    Only products whose sitemap <lastmod> is newer than the stored copy, or
+    that are new, are refetched; products gone from the sitemap are dropped.
+    The store must have been scraped before.
+
+    Runs under the store's lease, so it never interleaves with a scrape or
+    another sync of the same store on any node, and starts from the row in
+    the database rather than this node's cache, which may predate a save
+    made elsewhere.
+    """
+    start_time = time.time()
+
+    try:
+        store_url = normalize_store_url(str(request.website_url))
+
+        leases = get_lease_manager()
+        claimed = await run_in_threadpool(leases.claim, store_url, True)
+        if not claimed:
+            # Scraped or synced right now, here or on another node; sync on top of its result
+            await run_in_threadpool(leases.wait_until_free, store_url)
+            claimed = await run_in_threadpool(leases.claim, store_url, True)
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Store is being scraped or synced, try again later")
+
+        try:
+            brand_insights = await run_in_threadpool(load_saved_insights, store_url, db)
+            if brand_insights is None:
+                raise HTTPException(status_code=404, detail="Store insights not found, scrape the store first")
+
+            try:
+                result = await run_in_threadpool(
+                    SitemapSync(get_scraper()).sync,
+                    store_url,
+                    brand_insights.product_catalog
+                )
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Sitemap sync failed: {str(e)}")
+
+            products = result["products"]
+            hero_handles = {product.handle for product in brand_insights.hero_products}
+            synced = brand_insights.model_copy(update={
+                "product_catalog": products,
+                "total_products": len(products),
+                "hero_products": [product for product in products if product.handle in hero_handles]
+            })
+
+            await run_in_threadpool(save_brand_insights, synced, db)
+        finally:
+            # A sync is not a scrape: leave the store free, or queued if it was
+            await run_in_threadpool(leases.hand_back, store_url)
+
+        insights_cache.put(store_url, synced)
+        index_in_background(synced)
+
+        return ORJSONResponse(SyncResponse(
+            success=True,
+            store_url=store_url,
+            message="Product catalog synced from sitemap",
+            total_products=len(products),
+            added=result["added"],
+            updated=result["updated"],
+            deleted=result["deleted"],
+            unchanged=result["unchanged"],
+            processing_time=round(time.time() - start_time, 2)
+        ))
 
     except HTTPException:
         raise
@@ -70,12 +468,12 @@ async def analyze_competitors(
     background_tasks: BackgroundTasks,
     db: Session
 ):
-    competitor_urls = gemini_service.find_competitors(main_brand.store_name)
+    competitor_urls = get_gemini_service().find_competitors(main_brand.store_name)
     
     competitors_data = []
     for url in competitor_urls[:max_competitors]:
         try:
-            competitor_insights = scraper.scrape_store(url)
+            competitor_insights = await scrape_coalesced(url)
             if competitor_insights.scraping_success:
                 competitors_data.append(competitor_insights)
         except Exception as e:
@@ -84,14 +482,17 @@ async def analyze_competitors(
     if not competitors_data:
         return None
 
-    analysis_results = gemini_service.analyze_competitors(
-        main_brand.dict(), 
-        [c.dict() for c in competitors_data]
+    analysis_results = get_gemini_service().analyze_competitors(
+        brand_summary(main_brand),
+        [brand_summary(c) for c in competitors_data]
     )
+
+    product_matches = await run_in_threadpool(match_products, main_brand, competitors_data)
     
     competitor_analysis = CompetitorAnalysis(
         main_brand=main_brand,
         competitors=competitors_data,
+        product_matches=product_matches,
         **analysis_results
     )
     
@@ -99,6 +500,20 @@ async def analyze_competitors(
     
     return competitor_analysis
 
+def match_products(main_brand: BrandInsights, competitors: List[BrandInsights]):
+    """Equivalent products between the main brand and each competitor, with price deltas"""
+    index = get_product_index()
+    # Insights served from storage may not have passed through the scrape path
+    if not index.has_store(main_brand.store_url):
+        index.add_store(main_brand.store_url, main_brand.product_catalog)
+
+    matches = []
+    for competitor in competitors:
+        if not index.has_store(competitor.store_url):
+            index.add_store(competitor.store_url, competitor.product_catalog)
+        matches.extend(index.match(main_brand.store_url, competitor.store_url))
+    return matches
+
 def save_brand_insights(brand_insights: BrandInsights, db: Session):
     try:
         db_insights = db.query(BrandInsightsDB).filter(
@@ -113,6 +528,8 @@ def save_brand_insights(brand_insights: BrandInsights, db: Session):
             # Create new record
             db_insights = BrandInsightsDB(**brand_insights.dict())
             db.add(db_insights)
+        # Sitemap syncs keep scraped_at; incremental exports rely on this
+        db_insights.updated_at = datetime.now()
         
         db.commit()
         print(f"Saved brand insights for {brand_insights.store_url}")
@@ -139,42 +556,156 @@ def save_competitor_analysis(analysis: CompetitorAnalysis, db: Session):
         db.rollback()
         print(f"Error saving competitor analysis: {e}")
 
-@router.get("/insights/{store_url:path}")
+@router.get("/insights/{store_url:path}", response_class=ORJSONResponse)
 async def get_stored_insights(store_url: str, db: Session = Depends(get_db)):
     try:
-        insights = db.query(BrandInsightsDB).filter(
-            BrandInsightsDB.store_url == store_url
+        insights = db.query(BrandInsightsDB).options(undefer_group(BLOB_GROUP)).filter(
+            BrandInsightsDB.store_url.in_({store_url, normalize_store_url(store_url)})
         ).first()
         
         if not insights:
             raise HTTPException(status_code=404, detail="Store insights not found")
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "data": insights,
             "message": "Stored insights retrieved successfully"
-        }
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving insights: {str(e)}")
 
-@router.get("/competitors/{store_url:path}")
+@router.get("/search", response_class=ORJSONResponse)
+async def search_products(
+    q: Optional[str] = None,
+    min_price: Optional[float] = Query(default=None, ge=0),
+    max_price: Optional[float] = Query(default=None, ge=0),
+    available: Optional[bool] = None,
+    store_url: Optional[List[str]] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0)
+):
+    """Full-text search over every stored catalog, with price, availability and store filters"""
+    start_time = time.time()
+
+    try:
+        store_urls = [normalize_store_url(url) for url in store_url] if store_url else None
+        results = await run_in_threadpool(
+            get_search_index().search,
+            q, min_price, max_price, available, store_urls, limit, offset
+        )
+
+        return ORJSONResponse({
+            "success": True,
+            "data": results,
+            "message": "Search completed successfully",
+            "processing_time": round(time.time() - start_time, 4)
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching products: {str(e)}")
+
+@router.post("/batch", response_class=ORJSONResponse)
+async def queue_batch(request: BatchRequest):
+    """
+    Queue stores for the batch workers. Every node's worker claims queued
+    stores from the shared lease table, so the batch is spread across all
+    running instances and each store is scraped once.
+    """
+    try:
+        store_urls = [normalize_store_url(str(url)) for url in request.store_urls]
+        result = await run_in_threadpool(get_lease_manager().enqueue, store_urls)
+
+        return ORJSONResponse({
+            "success": True,
+            "data": result,
+            "message": f"Queued {result['queued']} of {result['queued'] + result['skipped']} stores"
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing batch: {str(e)}")
+
+@router.get("/batch/status", response_class=ORJSONResponse)
+async def batch_status(store_url: Optional[List[str]] = Query(default=None)):
+    """Queue counts, running leases per node and, optionally, the state of given stores"""
+    try:
+        leases = get_lease_manager()
+        data = await run_in_threadpool(leases.snapshot)
+        if store_url:
+            data["stores"] = [
+                await run_in_threadpool(leases.holder, normalize_store_url(url)) for url in store_url
+            ]
+
+        return ORJSONResponse({
+            "success": True,
+            "data": data,
+            "message": "Batch status retrieved successfully"
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving batch status: {str(e)}")
+
+@router.get("/export")
+async def export_stored_insights(
+    level: Literal["stores", "products"] = "stores",
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    updated_since: Optional[datetime] = None,
+    store_url: Optional[List[str]] = Query(default=None)
+):
+    """
+    Stream every stored store (or every stored product) as NDJSON, CSV or
+    Parquet. updated_since limits the export to stores saved (scraped or
+    synced) since then, for incremental pulls.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
+
+    store_urls = [normalize_store_url(url) for url in store_url] if store_url else None
+    media_type, extension = EXPORT_FORMATS[format]
+
+    return StreamingResponse(
+        iterate_in_threadpool(export_insights(level, format, updated_since, store_urls)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{level}.{extension}"'}
+    )
+
+@router.get("/analytics/{store_url:path}", response_class=ORJSONResponse)
+async def get_catalog_analytics(store_url: str, db: Session = Depends(get_db)):
+    try:
+        brand_insights, _ = await run_in_threadpool(load_stored_insights, normalize_store_url(store_url), db)
+        
+        if brand_insights is None:
+            raise HTTPException(status_code=404, detail="Store insights not found")
+        
+        stats = await run_in_threadpool(compute_catalog_stats, brand_insights.store_url, brand_insights.product_catalog)
+        return ORJSONResponse({
+            "success": True,
+            "data": stats,
+            "message": "Catalog analytics computed successfully"
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing catalog analytics: {str(e)}")
+
+@router.get("/competitors/{store_url:path}", response_class=ORJSONResponse)
 async def get_competitor_analysis(store_url: str, db: Session = Depends(get_db)):
     try:
-        analysis = db.query(CompetitorAnalysisDB).filter(
-            CompetitorAnalysisDB.main_brand_url == store_url
+        analysis = db.query(CompetitorAnalysisDB).options(undefer_group(BLOB_GROUP)).filter(
+            CompetitorAnalysisDB.main_brand_url.in_({store_url, normalize_store_url(store_url)})
         ).first()
         
         if not analysis:
             raise HTTPException(status_code=404, detail="Competitor analysis not found")
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "data": analysis,
             "message": "Competitor analysis retrieved successfully"
-        }
+        })
         
     except HTTPException:
         raise
@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..core.models import BrandInsights, CatalogStats, DiscountStats, PriceStats, Product, ShareEntry
+from ..core.prices import parse_price
+
+# Entries kept in the product type and vendor mixes
+MIX_TOP_N = 8
+
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def _mix(labels: List[str], top_n: int) -> List[ShareEntry]:
+    """Top labels by count with their share of the catalog"""
+    if not labels:
+        return []
+    names, counts = np.unique(np.array(labels, dtype=object), return_counts=True)
+    order = np.argsort(-counts, kind="stable")[:top_n]
+    total = counts.sum()
+    return [
+        ShareEntry(name=str(names[i]), count=int(counts[i]), share=_round(counts[i] / total))
+        for i in order
+    ]
+
+
+def compute_catalog_stats(store_url: str, products: List[Product], top_n: int = MIX_TOP_N) -> CatalogStats:
+    """
+    Numeric summary of a catalog in one pass over the products.
+
+    Columns are extracted once into NumPy arrays; every statistic after that
+    is vectorized. Products without a parseable price are left out of the
+    price and discount figures.
+    """
+    size = len(products)
+    if size == 0:
+        return CatalogStats(store_url=store_url)
+
+    price = np.fromiter((parse_price(p.price, np.nan) for p in products), dtype=float, count=size)
+    compare_at = np.fromiter((parse_price(p.compare_at_price, np.nan) for p in products), dtype=float, count=size)
+    available = np.fromiter((p.available for p in products), dtype=bool, count=size)
+    variants = np.fromiter((len(p.variants) for p in products), dtype=float, count=size)
+
+    priced = price[~np.isnan(price)]
+    price_stats = PriceStats()
+    if priced.size:
+        p10, p25, p50, p75, p90 = np.quantile(priced, [0.1, 0.25, 0.5, 0.75, 0.9])
+        price_stats = PriceStats(
+            min=_round(priced.min(), 2), max=_round(priced.max(), 2), mean=_round(priced.mean(), 2),
+            p10=_round(p10, 2), p25=_round(p25, 2), median=_round(p50, 2), p75=_round(p75, 2), p90=_round(p90, 2)
+        )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        discounted = (compare_at > price) & (price >= 0)
+        depth = 1.0 - price[discounted] / compare_at[discounted]
+
+    discount_stats = DiscountStats(share=_round(discounted.sum() / priced.size) if priced.size else 0.0)
+    if depth.size:
+        discount_stats.mean_depth = _round(depth.mean())
+        discount_stats.median_depth = _round(np.median(depth))
+        discount_stats.max_depth = _round(depth.max())
+
+    return CatalogStats(
+        store_url=store_url,
+        catalog_size=size,
+        priced_products=int(priced.size),
+        price=price_stats,
+        discount=discount_stats,
+        availability_rate=_round(available.mean()),
+        mean_variants=_round(variants.mean(), 2),
+        product_types=_mix([p.product_type or "Uncategorized" for p in products], top_n),
+        vendors=_mix([p.vendor or "Unknown" for p in products], top_n),
+    )
+
+
+def brand_summary(insights: BrandInsights) -> Dict[str, Any]:
+    """Compact, information-dense view of a brand for LLM prompts"""
+    context = insights.brand_context
+    return {
+        "store_name": insights.store_name,
+        "store_url": insights.store_url,
+        "brand_description": context.brand_description if context else None,
+        "headquarters": context.headquarters if context else None,
+        "hero_products": [p.title for p in insights.hero_products[:5]],
+        "catalog": compute_catalog_stats(insights.store_url, insights.product_catalog).model_dump(exclude={"store_url"}),
+        "faq_count": len(insights.faqs),
+        "social_platforms": sorted({s.platform for s in insights.social_handles}),
+        "policies": [
+            name for name in ("privacy_policy", "return_policy", "refund_policy", "shipping_policy", "terms_of_service")
+            if getattr(insights, name) is not None
+        ],
+    }
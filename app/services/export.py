@@ -0,0 +1,328 @@
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy.orm import Session
+
+from ..core.database import BrandInsightsDB, new_session
+from ..core.prices import parse_price
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+# brand_insights rows read per query; each batch is a fresh keyset query, so
+# memory stays bounded even on drivers without server-side cursors
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "100"))
+# Output is flushed to the client in chunks of roughly this many bytes
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "10000"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# (field, kind) per export level. "json" fields are nested structures: kept
+# as-is in NDJSON and written as JSON text in CSV and Parquet.
+STORE_FIELDS: List[Tuple[str, str]] = [
+    ("store_url", "str"),
+    ("store_name", "str"),
+    ("total_products", "int"),
+    ("scraped_at", "datetime"),
+    ("updated_at", "datetime"),
+    ("scraping_success", "bool"),
+    ("brand_context", "json"),
+    ("hero_products", "json"),
+    ("privacy_policy", "json"),
+    ("return_policy", "json"),
+    ("refund_policy", "json"),
+    ("shipping_policy", "json"),
+    ("terms_of_service", "json"),
+    ("faqs", "json"),
+    ("contact_info", "json"),
+    ("social_handles", "json"),
+    ("important_links", "json"),
+    ("errors", "json"),
+]
+
+PRODUCT_FIELDS: List[Tuple[str, str]] = [
+    ("store_url", "str"),
+    ("id", "int"),
+    ("handle", "str"),
+    ("title", "str"),
+    ("vendor", "str"),
+    ("product_type", "str"),
+    ("price", "float"),
+    ("compare_at_price", "float"),
+    ("available", "bool"),
+    ("tags", "list"),
+    ("images", "list"),
+    ("url", "str"),
+    ("updated_at", "str"),
+    ("description", "str"),
+    ("scraped_at", "datetime"),
+]
+
+EXPORT_LEVELS = {"stores": STORE_FIELDS, "products": PRODUCT_FIELDS}
+
+
+def _coerce(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == "float":
+        return parse_price(value)
+    if kind == "int":
+        return int(value)
+    if kind == "bool":
+        return bool(value)
+    if kind == "str" and not isinstance(value, str):
+        return orjson.dumps(value).decode()
+    if kind == "datetime" and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _store_filters(query, updated_since: Optional[datetime], store_urls: Optional[List[str]]):
+    if updated_since is not None:
+        query = query.filter(BrandInsightsDB.updated_at >= updated_since)
+    if store_urls:
+        query = query.filter(BrandInsightsDB.store_url.in_(store_urls))
+    return query
+
+
+def iter_rows(
+    db: Session,
+    columns: List[Any],
+    updated_since: Optional[datetime] = None,
+    store_urls: Optional[List[str]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Any]:
+    """
+    Stream brand_insights rows with the given columns, in id order.
+
+    Rows are read in keyset batches of batch_size, each streamed with
+    yield_per. No ORM objects are kept in the session, so memory does not
+    grow with the table. updated_since keeps stores saved (scraped or
+    synced) at or after that time.
+    """
+    columns = [BrandInsightsDB.id] + [column for column in columns if column is not BrandInsightsDB.id]
+    last_id = 0
+    while True:
+        query = _store_filters(db.query(*columns), updated_since, store_urls)
+        rows = (
+            query.filter(BrandInsightsDB.id > last_id)
+            .order_by(BrandInsightsDB.id)
+            .limit(batch_size)
+            .execution_options(yield_per=max(batch_size // 10, 1))
+        )
+
+        count = 0
+        for row in rows:
+            count += 1
+            last_id = row.id
+            yield row
+
+        if count < batch_size:
+            return
+
+
+def iter_records(
+    db: Session,
+    level: str = "stores",
+    updated_since: Optional[datetime] = None,
+    store_urls: Optional[List[str]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream export records from brand_insights, one store or product at a time,
+    selecting only the columns the level needs (see iter_rows).
+    """
+    fields = EXPORT_LEVELS[level]
+    if level == "stores":
+        columns = [getattr(BrandInsightsDB, name) for name, _ in fields]
+    else:
+        columns = [BrandInsightsDB.store_url, BrandInsightsDB.scraped_at, BrandInsightsDB.product_catalog]
+
+    for row in iter_rows(db, columns, updated_since, store_urls, batch_size):
+        if level == "stores":
+            yield {name: _coerce(kind, getattr(row, name)) for name, kind in fields}
+            continue
+
+        for product in row.product_catalog or []:
+            record = dict(product, store_url=row.store_url, scraped_at=row.scraped_at)
+            yield {name: _coerce(kind, record.get(name)) for name, kind in fields}
+
+
+class _Chunker:
+    """Collects encoded output and hands it back in EXPORT_CHUNK_BYTES pieces"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def add(self, data: bytes) -> Optional[bytes]:
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= EXPORT_CHUNK_BYTES:
+            return self.drain()
+        return None
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts, self.size = [], 0
+        return data
+
+
+def write_ndjson(records: Iterable[Dict[str, Any]], fields: List[Tuple[str, str]]) -> Iterator[bytes]:
+    chunker = _Chunker()
+    for record in records:
+        chunk = chunker.add(orjson.dumps(record) + b"\n")
+        if chunk:
+            yield chunk
+    tail = chunker.drain()
+    if tail:
+        yield tail
+
+
+def _csv_value(kind: str, value: Any) -> Any:
+    if value is None:
+        return ""
+    if kind in ("json", "list"):
+        return orjson.dumps(value).decode()
+    if kind == "datetime":
+        return value.isoformat()
+    return value
+
+
+def write_csv(records: Iterable[Dict[str, Any]], fields: List[Tuple[str, str]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in fields])
+
+    for record in records:
+        writer.writerow([_csv_value(kind, record[name]) for name, kind in fields])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ParquetSink:
+    """Write-only file object whose contents are drained after each row group"""
+
+    def __init__(self):
+        self.chunker = _Chunker()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunker.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _parquet_schema(fields: List[Tuple[str, str]]):
+    types = {
+        "str": pa.string(),
+        "json": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "datetime": pa.timestamp("us"),
+        "list": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in fields])
+
+
+def write_parquet(records: Iterable[Dict[str, Any]], fields: List[Tuple[str, str]]) -> Iterator[bytes]:
+    schema = _parquet_schema(fields)
+    json_fields = [name for name, kind in fields if kind == "json"]
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    def flush(batch: List[Dict[str, Any]]) -> bytes:
+        for record in batch:
+            for name in json_fields:
+                if record[name] is not None:
+                    record[name] = orjson.dumps(record[name]).decode()
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        return sink.chunker.drain()
+
+    try:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+                yield flush(batch)
+                batch = []
+        if batch:
+            yield flush(batch)
+    finally:
+        writer.close()
+    # The footer is written on close
+    yield sink.chunker.drain()
+
+
+WRITERS = {"ndjson": write_ndjson, "csv": write_csv, "parquet": write_parquet}
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def _iter_export(level: str, fmt: str, updated_since: Optional[datetime], store_urls: Optional[List[str]]) -> Iterator[bytes]:
+    db = new_session()
+    try:
+        records = iter_records(db, level, updated_since, store_urls)
+        for chunk in WRITERS[fmt](records, EXPORT_LEVELS[level]):
+            if chunk:
+                yield chunk
+    finally:
+        db.close()
+
+
+def export_insights(
+    level: str = "stores",
+    fmt: str = "ndjson",
+    updated_since: Optional[datetime] = None,
+    store_urls: Optional[List[str]] = None
+) -> Iterator[bytes]:
+    """
+    Encoded export of stored insights as a stream of byte chunks.
+
+    Arguments are validated up front; the returned iterator opens its own
+    session and closes it when exhausted or abandoned, so it can back a
+    streaming response or a CLI.
+    """
+    if level not in EXPORT_LEVELS:
+        raise ValueError(f"Unknown export level: {level}")
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    if updated_since is not None and updated_since.tzinfo is not None:
+        # updated_at is stored as naive local time
+        updated_since = updated_since.astimezone().replace(tzinfo=None)
+
+    return _iter_export(level, fmt, updated_since, store_urls)
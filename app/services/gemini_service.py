@@ -3,9 +3,8 @@
 import os
 import json
 import time
+from functools import lru_cache
 from typing import List, Dict, Any
-import google.generativeai as genai
-from google.api_core.exceptions import ResourceExhausted
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,11 +14,16 @@ class GeminiService:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
+        # Imported here: the SDK is slow to import and only needed once a call is made
+        import google.generativeai as genai
+
         # Initialize the Gen AI client
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel("gemini-1.5-flash")
 
     def _call_gemini(self, prompt: str, json_output: bool = True):
+        from google.api_core.exceptions import ResourceExhausted
+
         max_retries = 5
         base_delay = 2  # seconds
         for attempt in range(max_retries):
@@ -130,18 +134,26 @@ Return a JSON array of URLs:
         return result if isinstance(result, list) else []
 
     def analyze_competitors(self, main_brand: Dict, competitors: List[Dict]) -> Dict[str, Any]:
+        """main_brand and competitors are compact summaries (see catalog_analytics.brand_summary)"""
         prompt = f"""
-Analyze this competitive landscape.
+Analyze this competitive landscape. Each brand is summarized with catalog
+statistics: price quantiles, discount share and depth, availability rate,
+product type and vendor mix.
 
-Main Brand: {json.dumps(main_brand)[:2000]}
-Competitors: {json.dumps(competitors)[:2000]}
+Main Brand: {json.dumps(main_brand, default=str)}
+Competitors: {json.dumps(competitors, default=str)}
 
 Return JSON:
 {{"analysis_summary":"…","competitive_advantages":["…"],"market_insights":["…"]}}
         """
         result = self._call_gemini(prompt)
-        return result if isinstance(result, dict) else {{
+        return result if isinstance(result, dict) else {
             "analysis_summary": "Analysis failed",
             "competitive_advantages": [],
             "market_insights": []
-        }}
+        }
+
+@lru_cache(maxsize=None)
+def get_gemini_service() -> GeminiService:
+    """Shared GeminiService, created on first use"""
+    return GeminiService()
@@ -0,0 +1,237 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Consecutive failures (errors, timeouts, 5xx, 429) that open a host's circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+# First open period; doubles every time the circuit re-opens, up to the max
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30"))
+CIRCUIT_MAX_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_MAX_COOLDOWN_SECONDS", "600"))
+
+# Adaptive timeout: a multiple of the host's p95 latency, within [min, requested]
+TIMEOUT_LATENCY_MULTIPLIER = float(os.getenv("TIMEOUT_LATENCY_MULTIPLIER", "4"))
+MIN_TIMEOUT_SECONDS = float(os.getenv("MIN_TIMEOUT_SECONDS", "2"))
+LATENCY_WINDOW = 50
+LATENCY_MIN_SAMPLES = 5
+
+# Connection pools are kept per host; size them for many stores scraped at once
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "64"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+# Decoded bytes read from one page before the download is cut off. HTML
+# beyond the cap is dropped; JSON beyond its cap fails, as it can't be parsed.
+MAX_PAGE_BYTES = int(os.getenv("MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+MAX_JSON_BYTES = int(os.getenv("MAX_JSON_BYTES", str(32 * 1024 * 1024)))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+
+class ResponseTooLargeError(requests.exceptions.RequestException):
+    """Raised when a response body exceeds its size cap and truncation is not allowed"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class HostHealth:
+    def __init__(self):
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if len(self.latencies) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(math.ceil(percentile / 100 * len(ordered)) - 1, len(ordered) - 1)
+        return ordered[max(index, 0)]
+
+
+class HostHealthRegistry:
+    """
+    Per-host circuit breaker and latency tracker shared by every scraper session.
+
+    A host's circuit opens after CIRCUIT_FAILURE_THRESHOLD consecutive failures
+    or as soon as it answers 429/503 with Retry-After. While open, requests fail
+    immediately with CircuitOpenError. After the cooldown one probe request is
+    let through (half-open): success closes the circuit, failure re-opens it
+    with a doubled cooldown.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        cooldown: float = CIRCUIT_COOLDOWN_SECONDS,
+        max_cooldown: float = CIRCUIT_MAX_COOLDOWN_SECONDS
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._hosts: Dict[str, HostHealth] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        return (urlsplit(url).hostname or "").lower()
+
+    def _get(self, url: str) -> HostHealth:
+        key = self.host_key(url)
+        health = self._hosts.get(key)
+        if health is None:
+            health = self._hosts[key] = HostHealth()
+        return health
+
+    def before_request(self, url: str):
+        """Raise CircuitOpenError unless a request to this host may be sent"""
+        with self._lock:
+            health = self._get(url)
+            now = time.monotonic()
+            if health.open_until == 0.0:
+                return
+            if now < health.open_until:
+                raise CircuitOpenError(
+                    f"Circuit open for {self.host_key(url)}, retry in {health.open_until - now:.0f}s"
+                )
+            if health.probing:
+                raise CircuitOpenError(f"Circuit half-open for {self.host_key(url)}, probe in flight")
+            health.probing = True
+
+    def timeout_for(self, url: str, requested: float) -> float:
+        """Timeout adapted to the host's observed latency, never above the requested one"""
+        with self._lock:
+            p95 = self._get(url).latency_percentile(95)
+        if p95 is None:
+            return requested
+        return min(requested, max(MIN_TIMEOUT_SECONDS, p95 * TIMEOUT_LATENCY_MULTIPLIER))
+
+    def record_success(self, url: str, latency: float):
+        with self._lock:
+            health = self._get(url)
+            health.latencies.append(latency)
+            health.consecutive_failures = 0
+            health.trips = 0
+            health.open_until = 0.0
+            health.probing = False
+
+    def record_failure(self, url: str, retry_after: Optional[float] = None):
+        with self._lock:
+            health = self._get(url)
+            health.consecutive_failures += 1
+            reopen = health.probing or health.consecutive_failures >= self.failure_threshold
+            health.probing = False
+
+            if retry_after is not None:
+                open_for = min(retry_after, self.max_cooldown)
+            elif reopen:
+                open_for = min(self.cooldown * (2 ** health.trips), self.max_cooldown)
+            else:
+                return
+
+            health.trips += 1
+            health.open_until = time.monotonic() + open_for
+            print(f"Circuit opened for {self.host_key(url)} for {open_for:.0f}s")
+
+
+# Shared by every ShopifyScraper in the process
+host_health = HostHealthRegistry()
+
+
+class HealthTrackingSession(requests.Session):
+    """
+    requests.Session that consults the host circuit breaker before each request,
+    adapts the timeout to the host's latency and reports the outcome back.
+    """
+
+    def __init__(self, registry: HostHealthRegistry = host_health, default_timeout: float = 15):
+        super().__init__()
+        self.registry = registry
+        self.default_timeout = default_timeout
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        self.registry.before_request(url)
+
+        timeout = kwargs.get("timeout") or self.default_timeout
+        if isinstance(timeout, (int, float)):
+            kwargs["timeout"] = self.registry.timeout_for(url, timeout)
+
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception:
+            # Connection errors, timeouts, redirect loops; also ends a half-open probe
+            self.registry.record_failure(url)
+            raise
+
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = None
+            if response.status_code in (429, 503):
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.registry.record_failure(url, retry_after)
+        else:
+            self.registry.record_success(url, time.monotonic() - start)
+        return response
+
+    def get_capped(self, url, max_bytes: int = MAX_PAGE_BYTES, truncate: bool = True, **kwargs) -> requests.Response:
+        """
+        GET with the body streamed and capped at max_bytes (after content
+        decoding, so compressed bombs are capped too). Past the cap the
+        connection is dropped and the body truncated, or ResponseTooLargeError
+        raised when truncate is False. Error responses get an empty body.
+        The returned response behaves like a normal one (.content, .json()).
+        """
+        response = self.get(url, stream=True, **kwargs)
+        try:
+            if response.status_code >= 400:
+                response._content = b""
+                return response
+
+            length = response.headers.get("Content-Length", "")
+            if not truncate and length.isdigit() and int(length) > max_bytes:
+                raise ResponseTooLargeError(f"{url} is {int(length)} bytes, over the {max_bytes} byte cap")
+
+            chunks, size = [], 0
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                if size + len(chunk) > max_bytes:
+                    if not truncate:
+                        raise ResponseTooLargeError(f"{url} is over the {max_bytes} byte cap")
+                    chunks.append(chunk[:max_bytes - size])
+                    print(f"Truncated {url} at {max_bytes} bytes")
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+
+            response._content = b"".join(chunks)
+            return response
+        finally:
+            # Unread data is discarded with the connection rather than downloaded
+            response.close()
@@ -0,0 +1,224 @@
+"""
+CPU-bound HTML parsing, run in a process pool.
+
+Every parser takes raw page bytes and returns small picklable results, so
+BeautifulSoup trees never cross the process boundary. Keep this module free of
+heavy imports: it is imported by every pool worker.
+"""
+import multiprocessing
+import os
+import re
+import threading
+from html import unescape
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+
+def _default_parse_workers() -> int:
+    # os.cpu_count() reports the host's CPUs inside a container. Each worker is
+    # a separate interpreter with bs4 loaded, so stay small on memory-capped
+    # instances even when more CPUs are visible.
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS and Windows
+        cpus = os.cpu_count() or 1
+    return min(cpus, 2)
+
+
+# Number of parser processes; 0 parses inline in the calling thread
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(_default_parse_workers())))
+
+SHOPIFY_INDICATORS = [
+    'shopify.shop',
+    'shopify-section',
+    'cdn.shopify.com',
+    'myshopify.com',
+    'shopify.theme',
+    'shopify-features'
+]
+
+_PRODUCT_LINK = re.compile(r'/products/')
+_TAG = re.compile(r'<[^>]+>')
+_BLOCK_TAG = re.compile(r'<(script|style)\b.*?</\1\s*>', re.I | re.S)
+_WHITESPACE = re.compile(r'\s+')
+_INLINE_WHITESPACE = re.compile(r'[^\S\n]+')
+_COMMENT = re.compile(r'<!--.*?-->', re.S)
+# Blocks whose whitespace is rendered as written
+_PREFORMATTED = re.compile(r'<(pre|textarea)\b.*?</\1\s*>', re.I | re.S)
+# Tags that start a new line when keeping paragraphs
+_LINE_TAG = re.compile(r'<(?:br|/?(?:p|div|li|ul|ol|h[1-6]|tr|table|section|article|blockquote))\b[^>]*>', re.I)
+# Editor bookkeeping such as data-mce-fragment; never affects rendering
+_DATA_ATTRIBUTE = re.compile(r'\s+data-[\w-]+(?:=(?:"[^"]*"|\'[^\']*\'|[^\s>]+))?', re.I)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def detect_shopify(html: bytes) -> bool:
+    """Check page bytes for Shopify indicators"""
+    content = html.lower()
+    return any(indicator.encode() in content for indicator in SHOPIFY_INDICATORS)
+
+
+def parse_homepage(html: bytes, base_url: str) -> Dict[str, Any]:
+    """
+    Parse a storefront homepage.
+
+    Returns the store name (<title>), the product handles linked from the page
+    and the (title, url) pairs of header, nav and footer links.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title_tag = soup.find('title')
+    store_name = title_tag.get_text(strip=True) if title_tag else None
+
+    product_handles = sorted({
+        urlparse(link['href']).path.split('/')[-1]
+        for link in soup.find_all('a', href=_PRODUCT_LINK)
+    })
+
+    nav_links: List[Tuple[str, str]] = []
+    seen = set()
+    for element in soup.find_all(['nav', 'header', 'footer']):
+        for a in element.find_all('a', href=True):
+            href = a['href']
+            text = a.get_text(strip=True)
+
+            if not text or href.startswith('#') or href.startswith('mailto:') or href.startswith('tel:'):
+                continue
+
+            full_url = urljoin(base_url, href)
+            if full_url not in seen:
+                seen.add(full_url)
+                nav_links.append((text, full_url))
+
+    return {
+        "is_shopify": detect_shopify(html),
+        "store_name": store_name,
+        "product_handles": product_handles,
+        "nav_links": nav_links,
+    }
+
+
+def parse_policy_page(html: bytes) -> Dict[str, Optional[str]]:
+    """Extract the heading and policy body, as text, of a /policies/* page"""
+    soup = BeautifulSoup(html, 'html.parser')
+    heading = soup.find('h1')
+    body = soup.find('div', class_='rte') or soup.find('main') or soup.body
+    return {
+        "title": heading.get_text(strip=True) if heading else None,
+        "content": html_to_text(str(body), paragraphs=True) if body else "",
+    }
+
+
+def parse_content_page(html: bytes, base_url: str, max_chars: int = 20000) -> Dict[str, Any]:
+    """
+    Reduce a content page (FAQ, contact, about, policy) to its visible text.
+
+    Page chrome (scripts, styles, header, nav, footer) is dropped so the text
+    handed to the LLM is mostly the page body. Also returns the (title, url)
+    pairs of links in the page for further crawling.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title_tag = soup.find('title')
+    heading = soup.find('h1')
+    title = (heading or title_tag).get_text(strip=True) if (heading or title_tag) else None
+
+    links: List[Tuple[str, str]] = []
+    for a in soup.find_all('a', href=True):
+        href = a['href']
+        if href.startswith('#') or href.startswith('mailto:') or href.startswith('tel:'):
+            continue
+        links.append((a.get_text(strip=True), urljoin(base_url, href)))
+
+    for element in soup(['script', 'style', 'noscript', 'svg', 'header', 'nav', 'footer']):
+        element.decompose()
+    text = re.sub(r'\s+', ' ', soup.get_text(' ', strip=True))
+
+    return {"title": title, "text": text[:max_chars], "links": links}
+
+
+def html_to_text(html: Optional[str], paragraphs: bool = False) -> str:
+    """
+    Cheap regex-based HTML to text for fragments such as product descriptions
+    and policy bodies; use the BeautifulSoup parsers for whole pages. With
+    paragraphs, block elements become line breaks instead of spaces.
+    """
+    if not html:
+        return ""
+    html = _BLOCK_TAG.sub(" ", html)
+    if not paragraphs:
+        return _WHITESPACE.sub(" ", unescape(_TAG.sub(" ", html))).strip()
+
+    # Source line breaks are just whitespace; only block tags start new lines
+    html = _LINE_TAG.sub("\n", _WHITESPACE.sub(" ", html))
+    text = unescape(_TAG.sub(" ", html))
+    lines = (_INLINE_WHITESPACE.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _minify_segment(html: str) -> str:
+    html = _COMMENT.sub("", _BLOCK_TAG.sub("", html))
+    html = _TAG.sub(lambda tag: _DATA_ATTRIBUTE.sub("", tag.group(0)), html)
+    return _WHITESPACE.sub(" ", html)
+
+
+def minify_html(html: Optional[str]) -> str:
+    """
+    Shrink an HTML fragment without changing how it renders: drops comments,
+    scripts, styles and data-* attributes and collapses whitespace.
+    <pre> and <textarea> blocks, where whitespace is content, are kept as-is.
+    """
+    if not html:
+        return ""
+    parts, position = [], 0
+    for block in _PREFORMATTED.finditer(html):
+        parts.append(_minify_segment(html[position:block.start()]))
+        parts.append(block.group(0))
+        position = block.end()
+    parts.append(_minify_segment(html[position:]))
+    return "".join(parts).strip()
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared parser pool, started on first use; None when PARSE_WORKERS is 0"""
+    global _pool
+    if PARSE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def run_parser(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a parser in the process pool, falling back to inline parsing if the pool is unavailable"""
+    global _pool
+    pool = get_parse_pool()
+    if pool is None:
+        return fn(*args)
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        print("Parser pool broke, restarting it and parsing inline")
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return fn(*args)
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,38 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from ..core.models import BrandInsights
+
+
+class InsightsCache:
+    """Small in-process LRU of the most recently scraped BrandInsights, keyed by store URL"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, BrandInsights]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, store_url: str) -> Optional[BrandInsights]:
+        with self._lock:
+            insights = self._entries.get(store_url)
+            if insights is not None:
+                self._entries.move_to_end(store_url)
+            return insights
+
+    def put(self, store_url: str, insights: BrandInsights):
+        with self._lock:
+            current = self._entries.get(store_url)
+            # Never replace a newer scrape with an older one
+            if current is not None and current.scraped_at > insights.scraped_at:
+                return
+            self._entries[store_url] = insights
+            self._entries.move_to_end(store_url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def insights_age(insights: BrandInsights) -> float:
+    """Seconds since the insights were scraped"""
+    return max((datetime.now() - insights.scraped_at).total_seconds(), 0.0)
@@ -0,0 +1,492 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from ..core.database import StoreLeaseDB, new_session
+
+# Identifies this process in the lease table; unique per uvicorn worker
+NODE_ID = os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+# A running lease not renewed for this long is considered abandoned and can be reclaimed
+LEASE_TTL_SECONDS = float(os.getenv("LEASE_TTL_SECONDS", "60"))
+LEASE_HEARTBEAT_SECONDS = float(os.getenv("LEASE_HEARTBEAT_SECONDS", str(LEASE_TTL_SECONDS / 3)))
+# A finished store stays done this long; re-enqueuing it meanwhile is a no-op
+LEASE_DONE_SECONDS = float(os.getenv("LEASE_DONE_SECONDS", "900"))
+# Queued stores each node works on at once; 0 disables the batch worker
+BATCH_WORKER_CONCURRENCY = int(os.getenv("BATCH_WORKER_CONCURRENCY", "2"))
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "5"))
+# How long a request waits for another node's scrape of the same store
+LEASE_WAIT_SECONDS = float(os.getenv("LEASE_WAIT_SECONDS", "90"))
+# Finished leases are deleted this long after they expire, checked every
+# LEASE_PURGE_INTERVAL_SECONDS by the heartbeat thread
+LEASE_PURGE_AFTER_SECONDS = float(os.getenv("LEASE_PURGE_AFTER_SECONDS", "86400"))
+LEASE_PURGE_INTERVAL_SECONDS = float(os.getenv("LEASE_PURGE_INTERVAL_SECONDS", "3600"))
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+def rendezvous_weight(node: str, key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{node}|{key}".encode(), digest_size=8).digest(), "big")
+
+
+def rendezvous_order(keys: Iterable[str], node: str) -> List[str]:
+    """
+    Keys in this node's highest-random-weight order. Every node walks the
+    same queue in a different order, so concurrent claims rarely collide.
+    """
+    return sorted(keys, key=lambda key: rendezvous_weight(node, key), reverse=True)
+
+
+class LeaseManager:
+    """
+    Cross-node coordination through the store_leases table.
+
+    Claims are conditional UPDATEs, so exactly one node wins a store even
+    when several race for it, on SQLite and MySQL alike. Running leases are
+    renewed by a heartbeat thread; when a node dies its leases expire after
+    the TTL and are reclaimed by the next node that looks. Completion is
+    fenced by the claim token, so a node that lost its lease (e.g. after a
+    long pause) cannot overwrite the new owner's state.
+
+    Lease times come from each node's clock, so nodes need roughly
+    synchronized clocks (skew well under the TTL).
+    """
+
+    def __init__(
+        self,
+        owner: str = NODE_ID,
+        ttl: float = LEASE_TTL_SECONDS,
+        heartbeat_interval: float = LEASE_HEARTBEAT_SECONDS,
+        done_for: float = LEASE_DONE_SECONDS,
+        session_factory: Callable = new_session
+    ):
+        self.owner = owner
+        self.ttl = timedelta(seconds=ttl)
+        self.heartbeat_interval = heartbeat_interval
+        self.done_for = timedelta(seconds=done_for)
+        self.session_factory = session_factory
+        # store_url -> claim token of the leases this node holds
+        self._held: Dict[str, int] = {}
+        # Held leases taken from the queue (pending or abandoned rows), as
+        # opposed to interactive scrapes of stores nobody queued
+        self._from_queue: Set[str] = set()
+        self._next_purge = time.monotonic() + LEASE_PURGE_INTERVAL_SECONDS
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+
+    def enqueue(self, store_urls: Iterable[str]) -> Dict[str, int]:
+        """
+        Queue stores for the batch workers. Stores already queued, running or
+        finished within LEASE_DONE_SECONDS are left alone, so the same batch
+        submitted by several nodes (or twice) is only scraped once.
+        """
+        store_urls = list(dict.fromkeys(store_urls))
+        now = datetime.utcnow()
+        queued = 0
+
+        db = self.session_factory()
+        try:
+            existing = {
+                url for (url,) in db.query(StoreLeaseDB.store_url).filter(StoreLeaseDB.store_url.in_(store_urls))
+            }
+            for url in store_urls:
+                if url in existing:
+                    continue
+                db.add(StoreLeaseDB(store_url=url, status=PENDING, token=0, created_at=now))
+                try:
+                    db.commit()
+                    queued += 1
+                except IntegrityError:
+                    # Queued by another node in the meantime
+                    db.rollback()
+
+            # Expired leases: finished long enough ago, or abandoned by a dead node
+            queued += db.query(StoreLeaseDB).filter(
+                StoreLeaseDB.store_url.in_(existing),
+                StoreLeaseDB.status != PENDING,
+                StoreLeaseDB.expires_at < now
+            ).update({StoreLeaseDB.status: PENDING, StoreLeaseDB.owner: None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+        return {"queued": queued, "skipped": len(store_urls) - queued}
+
+    def claim(self, store_url: str, include_done: bool = False) -> bool:
+        """
+        Try to take the lease on a store. Pending and expired leases can be
+        claimed; with include_done, so can finished ones, and a missing row
+        is created. Running leases held by anyone (this node included) can't.
+        """
+        now = datetime.utcnow()
+        queued = or_(
+            StoreLeaseDB.status == PENDING,
+            and_(StoreLeaseDB.status == RUNNING, StoreLeaseDB.expires_at < now)
+        )
+
+        values = {
+            StoreLeaseDB.status: RUNNING,
+            StoreLeaseDB.owner: self.owner,
+            StoreLeaseDB.token: StoreLeaseDB.token + 1,
+            StoreLeaseDB.claimed_at: now,
+            StoreLeaseDB.heartbeat_at: now,
+            StoreLeaseDB.expires_at: now + self.ttl,
+        }
+
+        db = self.session_factory()
+        try:
+            claimed = db.query(StoreLeaseDB).filter(
+                StoreLeaseDB.store_url == store_url, queued
+            ).update(values, synchronize_session=False)
+            db.commit()
+            from_queue = bool(claimed)
+
+            if not claimed and include_done:
+                claimed = db.query(StoreLeaseDB).filter(
+                    StoreLeaseDB.store_url == store_url,
+                    StoreLeaseDB.status.in_([DONE, FAILED])
+                ).update(values, synchronize_session=False)
+                db.commit()
+
+            if not claimed and include_done:
+                db.add(StoreLeaseDB(
+                    store_url=store_url, status=RUNNING, owner=self.owner, token=1,
+                    claimed_at=now, heartbeat_at=now, expires_at=now + self.ttl, created_at=now
+                ))
+                try:
+                    db.commit()
+                    claimed = 1
+                except IntegrityError:
+                    db.rollback()
+
+            if not claimed:
+                return False
+
+            token = db.query(StoreLeaseDB.token).filter(
+                StoreLeaseDB.store_url == store_url, StoreLeaseDB.owner == self.owner
+            ).scalar()
+        finally:
+            db.close()
+
+        if token is None:
+            return False
+        with self._lock:
+            self._held[store_url] = token
+            if from_queue:
+                self._from_queue.add(store_url)
+            else:
+                self._from_queue.discard(store_url)
+        self._ensure_heartbeat()
+        return True
+
+    def claim_pending(self, limit: int) -> List[str]:
+        """Claim up to limit queued or abandoned stores for this node"""
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+
+        db = self.session_factory()
+        try:
+            # Over-fetch so losing a few races still fills the slots
+            candidates = [
+                url for (url,) in db.query(StoreLeaseDB.store_url).filter(or_(
+                    StoreLeaseDB.status == PENDING,
+                    and_(StoreLeaseDB.status == RUNNING, StoreLeaseDB.expires_at < now)
+                )).order_by(StoreLeaseDB.created_at).limit(limit * 4)
+            ]
+        finally:
+            db.close()
+
+        claimed = []
+        for url in rendezvous_order(candidates, self.owner):
+            if len(claimed) >= limit:
+                break
+            if self.claim(url):
+                claimed.append(url)
+        return claimed
+
+    def _finish(self, store_url: str, values: Dict) -> Optional[bool]:
+        """Apply values to a held lease and forget it; None if it was not held"""
+        with self._lock:
+            token = self._held.pop(store_url, None)
+            self._from_queue.discard(store_url)
+        if token is None:
+            return None
+
+        db = self.session_factory()
+        try:
+            updated = db.query(StoreLeaseDB).filter(
+                StoreLeaseDB.store_url == store_url,
+                StoreLeaseDB.owner == self.owner,
+                StoreLeaseDB.token == token
+            ).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        return bool(updated)
+
+    def complete(self, store_url: str, success: bool = True) -> bool:
+        """Mark a held lease done (or failed); False if it was lost to another node"""
+        updated = self._finish(store_url, {
+            StoreLeaseDB.status: DONE if success else FAILED,
+            StoreLeaseDB.expires_at: datetime.utcnow() + self.done_for,
+        })
+        if updated is None:
+            return False
+        if not updated:
+            print(f"Lease on {store_url} was lost before completion")
+        return updated
+
+    def release(self, store_url: str) -> bool:
+        """Give a held lease back to the queue without completing it"""
+        return bool(self._finish(store_url, {StoreLeaseDB.status: PENDING, StoreLeaseDB.owner: None}))
+
+    def abandon(self, store_url: str) -> bool:
+        """
+        Drop a held lease without queueing the store: it is marked failed and
+        already expired, so batch workers leave it alone while the next
+        interactive scrape or enqueue can take it at once.
+        """
+        return bool(self._finish(store_url, {
+            StoreLeaseDB.status: FAILED,
+            StoreLeaseDB.expires_at: datetime.utcnow(),
+        }))
+
+    def hand_back(self, store_url: str) -> bool:
+        """
+        Give up a held lease without recording a result: a store taken from
+        the queue goes back to it, any other is abandoned.
+        """
+        with self._lock:
+            from_queue = store_url in self._from_queue
+        return self.release(store_url) if from_queue else self.abandon(store_url)
+
+    def held(self) -> List[str]:
+        with self._lock:
+            return list(self._held)
+
+    def renew(self) -> List[str]:
+        """Extend every held lease; returns (and forgets) the ones that were lost"""
+        with self._lock:
+            held = dict(self._held)
+        if not held:
+            return []
+
+        now = datetime.utcnow()
+        lost = []
+        db = self.session_factory()
+        try:
+            for store_url, token in held.items():
+                updated = db.query(StoreLeaseDB).filter(
+                    StoreLeaseDB.store_url == store_url,
+                    StoreLeaseDB.owner == self.owner,
+                    StoreLeaseDB.token == token,
+                    StoreLeaseDB.status == RUNNING
+                ).update({
+                    StoreLeaseDB.heartbeat_at: now,
+                    StoreLeaseDB.expires_at: now + self.ttl,
+                }, synchronize_session=False)
+                if not updated:
+                    lost.append(store_url)
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            # Leases completed or released while renewing were not lost
+            lost = [url for url in lost if self._held.get(url) == held[url]]
+            for store_url in lost:
+                del self._held[store_url]
+                self._from_queue.discard(store_url)
+        if lost:
+            print(f"Lost leases: {', '.join(lost)}")
+        return lost
+
+    def _ensure_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is not None or self._stopped.is_set():
+                return
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="lease-heartbeat", daemon=True)
+            self._heartbeat_thread.start()
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self.renew()
+            except Exception as e:
+                print(f"Lease heartbeat failed: {e}")
+
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + LEASE_PURGE_INTERVAL_SECONDS
+                try:
+                    purged = self.purge()
+                    if purged:
+                        print(f"Purged {purged} finished leases")
+                except Exception as e:
+                    print(f"Lease purge failed: {e}")
+
+    def holder(self, store_url: str) -> Optional[Dict]:
+        """Current lease state of a store, or None when it has no row"""
+        db = self.session_factory()
+        try:
+            row = db.query(StoreLeaseDB).filter(StoreLeaseDB.store_url == store_url).first()
+            if row is None:
+                return None
+            return {
+                "store_url": row.store_url,
+                "status": row.status,
+                "owner": row.owner,
+                "expires_at": row.expires_at,
+                "active": row.status == RUNNING and row.expires_at is not None and row.expires_at > datetime.utcnow(),
+            }
+        finally:
+            db.close()
+
+    def wait_until_free(self, store_url: str, timeout: float = LEASE_WAIT_SECONDS, poll_interval: float = 1.0) -> bool:
+        """Block until no node holds a live running lease on the store; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            holder = self.holder(store_url)
+            if holder is None or not holder["active"]:
+                return True
+            if time.monotonic() >= deadline or self._stopped.wait(poll_interval):
+                return False
+
+    def purge(self, older_than: float = LEASE_PURGE_AFTER_SECONDS) -> int:
+        """Delete finished leases that expired more than older_than seconds ago"""
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+        db = self.session_factory()
+        try:
+            deleted = db.query(StoreLeaseDB).filter(
+                StoreLeaseDB.status.in_([DONE, FAILED]), StoreLeaseDB.expires_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def snapshot(self) -> Dict:
+        """Queue counts by status and running leases per node"""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            statuses = dict(
+                db.query(StoreLeaseDB.status, func.count()).group_by(StoreLeaseDB.status).all()
+            )
+            running = dict(
+                db.query(StoreLeaseDB.owner, func.count())
+                .filter(StoreLeaseDB.status == RUNNING, StoreLeaseDB.expires_at >= now)
+                .group_by(StoreLeaseDB.owner).all()
+            )
+        finally:
+            db.close()
+        return {"node": self.owner, "statuses": statuses, "running_by_node": running}
+
+    def stop(self):
+        """
+        Stop heartbeating and give up held leases: those taken from the queue
+        go back to it, interactive ones are abandoned rather than queued.
+        """
+        self._stopped.set()
+        for store_url in self.held():
+            try:
+                self.hand_back(store_url)
+            except Exception as e:
+                print(f"Error releasing lease on {store_url}: {e}")
+
+
+class LeaseWorker:
+    """
+    Background loop that claims queued stores from the lease table and
+    processes them, keeping up to `concurrency` in flight. Run one per node;
+    adding nodes adds throughput, since each claims its own share.
+
+    process(store_url) returns True on success; failures are recorded as
+    failed rather than retried, so a broken store can't loop forever.
+    """
+
+    def __init__(
+        self,
+        leases: LeaseManager,
+        process: Callable[[str], bool],
+        concurrency: int = BATCH_WORKER_CONCURRENCY,
+        poll_interval: float = BATCH_POLL_SECONDS
+    ):
+        self.leases = leases
+        self.process = process
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-worker")
+        self._thread = threading.Thread(target=self._loop, name="batch-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_once(self) -> int:
+        """Claim work for every free slot; returns how many stores were started"""
+        with self._lock:
+            free = self.concurrency - self._active
+        claimed = self.leases.claim_pending(free)
+        for store_url in claimed:
+            with self._lock:
+                self._active += 1
+            self._executor.submit(self._run, store_url)
+        return len(claimed)
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            try:
+                started = self.run_once()
+            except Exception as e:
+                print(f"Batch worker error: {e}")
+                started = 0
+            # Poll again right away while the queue keeps yielding work,
+            # otherwise sleep until a slot frees up or the poll interval passes
+            if started == 0 or self._active >= self.concurrency:
+                self._wake.wait(self.poll_interval)
+
+    def _run(self, store_url: str):
+        success = False
+        try:
+            success = bool(self.process(store_url))
+        except Exception as e:
+            print(f"Error processing queued store {store_url}: {e}")
+        finally:
+            try:
+                self.leases.complete(store_url, success)
+            except Exception as e:
+                print(f"Error completing lease on {store_url}: {e}")
+            with self._lock:
+                self._active -= 1
+            self._wake.set()
+
+
+@lru_cache(maxsize=None)
+def get_lease_manager() -> LeaseManager:
+    """This node's lease manager"""
+    return LeaseManager()
@@ -0,0 +1,217 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..core.models import Product, ProductMatch
+from ..core.prices import parse_price
+
+# MinHash signature length, split into LSH bands of MATCH_ROWS rows. With
+# 64 permutations in 16 bands of 4, pairs above ~0.5 Jaccard similarity are
+# very likely to share a bucket.
+MATCH_PERMUTATIONS = int(os.getenv("MATCH_PERMUTATIONS", "64"))
+MATCH_ROWS = int(os.getenv("MATCH_ROWS", "4"))
+# Minimum exact Jaccard similarity of token sets for a reported match
+MATCH_THRESHOLD = float(os.getenv("MATCH_THRESHOLD", "0.5"))
+# Stores kept in the index; the least recently used are evicted beyond this
+MATCH_INDEX_MAX_STORES = int(os.getenv("MATCH_INDEX_MAX_STORES", "256"))
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"the", "and", "for", "with", "of", "a", "an", "in", "by", "to", "new"}
+
+
+def product_tokens(product: Product) -> FrozenSet[str]:
+    """Words and word pairs from the title, plus tags and product type"""
+    words = [w for w in _WORD.findall(product.title.lower()) if w not in STOPWORDS]
+    tokens = set(words)
+    tokens.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    tokens.update(f"tag:{tag.strip().lower()}" for tag in product.tags if tag.strip())
+    if product.product_type:
+        tokens.add(f"type:{product.product_type.strip().lower()}")
+    return frozenset(tokens)
+
+
+def _hash32(token: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little")
+
+
+class _Listing(NamedTuple):
+    """What a match reports about a product; the full Product is not kept"""
+    title: str
+    price: Optional[float]
+
+
+class _StoreEntry:
+    def __init__(self):
+        self.listings: Dict[str, _Listing] = {}
+        self.tokens: Dict[str, FrozenSet[str]] = {}
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: Dict[Tuple[int, bytes], List[str]] = {}
+
+
+class ProductMatchIndex:
+    """
+    MinHash/LSH index for finding equivalent products across stores.
+
+    Each product becomes a set of title words, title word pairs, tags and
+    product type. Its MinHash signature is banded into LSH buckets, so
+    matching a catalog against a competitor only compares products that share
+    a bucket instead of every pair. Candidates are then checked against the
+    exact Jaccard similarity of their token sets.
+
+    Stores are added as they are scraped. Re-adding a store only recomputes
+    signatures for products whose tokens changed. Only the max_stores most
+    recently added or matched stores are kept.
+    """
+
+    def __init__(
+        self,
+        permutations: int = MATCH_PERMUTATIONS,
+        rows: int = MATCH_ROWS,
+        seed: int = 1,
+        max_stores: int = MATCH_INDEX_MAX_STORES
+    ):
+        if permutations % rows:
+            raise ValueError("permutations must be a multiple of rows")
+        self.permutations = permutations
+        self.rows = rows
+        self.bands = permutations // rows
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=permutations, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=permutations, dtype=np.uint64)
+        self.max_stores = max_stores
+        self._stores: "OrderedDict[str, _StoreEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def signatures(self, token_sets: List[FrozenSet[str]]) -> np.ndarray:
+        """MinHash signatures for many token sets at once, shape (len(token_sets), permutations)"""
+        result = np.full((len(token_sets), self.permutations), _MAX_HASH, dtype=np.uint64)
+        nonempty = [i for i, tokens in enumerate(token_sets) if tokens]
+        if not nonempty:
+            return result
+
+        lengths = np.array([len(token_sets[i]) for i in nonempty])
+        hashes = np.fromiter(
+            (_hash32(token) for i in nonempty for token in token_sets[i]),
+            dtype=np.uint64, count=int(lengths.sum())
+        )
+        # (a * h + b) mod p stays below 2**64 because a, b and h are all 32-bit
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        result[nonempty] = np.minimum.reduceat(permuted, starts, axis=0)
+        return result
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def add_store(self, store_url: str, products: List[Product]):
+        """Index (or re-index) a store's catalog"""
+        with self._lock:
+            previous = self._stores.get(store_url)
+
+        entry = _StoreEntry()
+        for product in products:
+            if product.handle:
+                entry.listings[product.handle] = _Listing(product.title, parse_price(product.price))
+                entry.tokens[product.handle] = product_tokens(product)
+
+        # Only products whose tokens changed since the last add need new signatures
+        stale = [
+            handle for handle, tokens in entry.tokens.items()
+            if previous is None or previous.tokens.get(handle) != tokens
+        ]
+        fresh = dict(zip(stale, self.signatures([entry.tokens[handle] for handle in stale])))
+
+        for handle in entry.tokens:
+            signature = fresh[handle] if handle in fresh else previous.signatures[handle]
+            entry.signatures[handle] = signature
+            for key in self._band_keys(signature):
+                entry.buckets.setdefault(key, []).append(handle)
+
+        with self._lock:
+            self._stores[store_url] = entry
+            self._stores.move_to_end(store_url)
+            while len(self._stores) > self.max_stores:
+                self._stores.popitem(last=False)
+
+    def has_store(self, store_url: str) -> bool:
+        """Whether the store is indexed; counts as a use for eviction"""
+        with self._lock:
+            if store_url not in self._stores:
+                return False
+            self._stores.move_to_end(store_url)
+            return True
+
+    def match(self, store_url: str, competitor_url: str, threshold: float = MATCH_THRESHOLD) -> List[ProductMatch]:
+        """
+        Best competitor match for each product of store_url, at or above
+        threshold, most similar first.
+        """
+        with self._lock:
+            main = self._stores.get(store_url)
+            competitor = self._stores.get(competitor_url)
+            for url in (store_url, competitor_url):
+                if url in self._stores:
+                    self._stores.move_to_end(url)
+        if main is None or competitor is None:
+            return []
+
+        matches = []
+        for handle, signature in main.signatures.items():
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(competitor.buckets.get(key, ()))
+            if not candidates:
+                continue
+
+            tokens = main.tokens[handle]
+            best_handle, best_similarity = None, 0.0
+            for candidate in candidates:
+                other = competitor.tokens[candidate]
+                similarity = len(tokens & other) / len(tokens | other) if tokens or other else 0.0
+                if similarity > best_similarity:
+                    best_handle, best_similarity = candidate, similarity
+
+            if best_handle is None or best_similarity < threshold:
+                continue
+
+            listing = main.listings[handle]
+            other_listing = competitor.listings[best_handle]
+            price, other_price = listing.price, other_listing.price
+            price_delta = price_delta_pct = None
+            if price is not None and other_price is not None:
+                price_delta = round(other_price - price, 2)
+                price_delta_pct = round(price_delta / price * 100, 2) if price else None
+
+            matches.append(ProductMatch(
+                competitor_url=competitor_url,
+                main_handle=handle,
+                main_title=listing.title,
+                main_price=price,
+                competitor_handle=best_handle,
+                competitor_title=other_listing.title,
+                competitor_price=other_price,
+                similarity=round(best_similarity, 4),
+                price_delta=price_delta,
+                price_delta_pct=price_delta_pct
+            ))
+
+        matches.sort(key=lambda match: match.similarity, reverse=True)
+        return matches
+
+
+@lru_cache(maxsize=None)
+def get_product_index() -> ProductMatchIndex:
+    """Shared product matching index, filled as stores are scraped"""
+    return ProductMatchIndex()
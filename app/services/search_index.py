@@ -0,0 +1,352 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..core.database import BrandInsightsDB, new_session
+from ..core.models import Product
+from ..core.prices import parse_price
+from .export import iter_rows
+from .html_parsing import html_to_text
+
+# SQLite file holding the index; separate from the main database, which may be
+# MySQL. Each node keeps its own file: it indexes the saves it makes right away
+# and catches up on everything else from brand_insights (SearchIndexSync).
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.db")
+
+# Seconds between catch-up passes over brand_insights; 0 disables them
+SEARCH_INDEX_SYNC_SECONDS = float(os.getenv("SEARCH_INDEX_SYNC_SECONDS", "60"))
+# Each pass re-checks rows saved this long before the newest indexed one, for
+# clock skew between nodes and saves that committed late
+SEARCH_INDEX_SYNC_OVERLAP_SECONDS = float(os.getenv("SEARCH_INDEX_SYNC_OVERLAP_SECONDS", "300"))
+# Catalogs loaded from the database per query during a catch-up pass
+SEARCH_INDEX_SYNC_BATCH = 50
+
+# bm25 column weights: title, tags, product_type, vendor, body
+BM25_WEIGHTS = (10.0, 5.0, 3.0, 3.0, 1.0)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    store_url TEXT NOT NULL,
+    handle TEXT NOT NULL,
+    title TEXT,
+    tags TEXT,
+    product_type TEXT,
+    vendor TEXT,
+    body TEXT,
+    price REAL,
+    available INTEGER,
+    url TEXT,
+    image TEXT,
+    digest TEXT,
+    UNIQUE (store_url, handle)
+);
+CREATE INDEX IF NOT EXISTS products_price ON products (price);
+CREATE INDEX IF NOT EXISTS products_available_price ON products (available, price);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    title, tags, product_type, vendor, body,
+    content='products', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, title, tags, product_type, vendor, body)
+    VALUES (new.id, new.title, new.tags, new.product_type, new.vendor, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, title, tags, product_type, vendor, body)
+    VALUES ('delete', old.id, old.title, old.tags, old.product_type, old.vendor, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, title, tags, product_type, vendor, body)
+    VALUES ('delete', old.id, old.title, old.tags, old.product_type, old.vendor, old.body);
+    INSERT INTO products_fts (rowid, title, tags, product_type, vendor, body)
+    VALUES (new.id, new.title, new.tags, new.product_type, new.vendor, new.body);
+END;
+
+-- brand_insights.updated_at of the catalog last indexed by a catch-up pass
+CREATE TABLE IF NOT EXISTS synced_stores (
+    store_url TEXT PRIMARY KEY,
+    updated_at TEXT NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO products (store_url, handle, title, tags, product_type, vendor, body, price, available, url, image, digest)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (store_url, handle) DO UPDATE SET
+    title = excluded.title, tags = excluded.tags, product_type = excluded.product_type,
+    vendor = excluded.vendor, body = excluded.body, price = excluded.price,
+    available = excluded.available, url = excluded.url, image = excluded.image,
+    digest = excluded.digest
+"""
+
+
+def product_row(store_url: str, product: Product) -> tuple:
+    """Index row for a product; the trailing digest detects unchanged products"""
+    row = (
+        store_url,
+        product.handle,
+        product.title,
+        ", ".join(product.tags),
+        product.product_type or "",
+        product.vendor or "",
+        html_to_text(product.description),
+        parse_price(product.price),
+        int(product.available),
+        product.url,
+        product.images[0] if product.images else None,
+    )
+    digest = hashlib.blake2b(repr(row).encode(), digest_size=16).hexdigest()
+    return row + (digest,)
+
+
+def match_expression(query: str) -> Optional[str]:
+    """FTS5 query matching every word of a free-text query; the last word as a prefix"""
+    tokens = _TOKEN.findall(query or "")
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return " ".join(terms)
+
+
+class ProductSearchIndex:
+    """
+    Full-text and attribute search over stored catalogs, backed by SQLite FTS5.
+
+    Title, tags, product type, vendor and description text are indexed with
+    bm25 ranking; price and availability live in a regular table for
+    filtering. index_store() is incremental: unchanged products (same digest)
+    are not rewritten and products missing from the new catalog are removed.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            self.connection().executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def index_store(self, store_url: str, products: Iterable[Product]) -> Dict[str, int]:
+        """Bring the index for one store in line with its current catalog"""
+        rows = {}
+        for product in products:
+            if product.handle:
+                rows[product.handle] = product_row(store_url, product)
+
+        connection = self.connection()
+        with self._write_lock, connection:
+            existing = dict(connection.execute(
+                "SELECT handle, digest FROM products WHERE store_url = ?", (store_url,)
+            ))
+
+            removed = [(store_url, handle) for handle in existing if handle not in rows]
+            connection.executemany("DELETE FROM products WHERE store_url = ? AND handle = ?", removed)
+
+            changed = [row for handle, row in rows.items() if existing.get(handle) != row[-1]]
+            connection.executemany(UPSERT, changed)
+
+        return {"indexed": len(changed), "removed": len(removed), "unchanged": len(rows) - len(changed)}
+
+    def watermark(self) -> Optional[datetime]:
+        """updated_at of the most recently saved catalog a catch-up pass has indexed"""
+        row = self.connection().execute("SELECT MAX(updated_at) FROM synced_stores").fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def synced_versions(self, store_urls: List[str]) -> Dict[str, str]:
+        versions = {}
+        for start in range(0, len(store_urls), 500):
+            chunk = store_urls[start:start + 500]
+            versions.update(self.connection().execute(
+                f"SELECT store_url, updated_at FROM synced_stores WHERE store_url IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ))
+        return versions
+
+    def mark_synced(self, store_url: str, updated_at: datetime):
+        connection = self.connection()
+        with self._write_lock, connection:
+            connection.execute(
+                "INSERT INTO synced_stores (store_url, updated_at) VALUES (?, ?) "
+                "ON CONFLICT (store_url) DO UPDATE SET updated_at = excluded.updated_at",
+                (store_url, updated_at.isoformat())
+            )
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        available: Optional[bool] = None,
+        store_urls: Optional[List[str]] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Ranked, paginated search. Without a text query, matching products are
+        ordered by price. has_more tells whether another page exists.
+        """
+        conditions, params = [], []
+        match = match_expression(query)
+
+        if match:
+            weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+            sql = (
+                f"SELECT p.*, bm25(products_fts, {weights}) AS score "
+                "FROM products_fts JOIN products p ON p.id = products_fts.rowid"
+            )
+            conditions.append("products_fts MATCH ?")
+            params.append(match)
+            order = "score"
+        else:
+            sql = "SELECT p.*, NULL AS score FROM products p"
+            order = "p.price IS NULL, p.price, p.id"
+
+        if min_price is not None:
+            conditions.append("p.price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("p.price <= ?")
+            params.append(max_price)
+        if available is not None:
+            conditions.append("p.available = ?")
+            params.append(int(available))
+        if store_urls:
+            conditions.append(f"p.store_url IN ({', '.join('?' for _ in store_urls)})")
+            params.extend(store_urls)
+
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order} LIMIT ? OFFSET ?"
+        # One extra row tells whether there is a next page without a COUNT(*)
+        params.extend([limit + 1, offset])
+
+        cursor = self.connection().execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        hits = []
+        for values in cursor.fetchall():
+            row = dict(zip(columns, values))
+            hits.append({
+                "store_url": row["store_url"],
+                "handle": row["handle"],
+                "title": row["title"],
+                "product_type": row["product_type"],
+                "vendor": row["vendor"],
+                "tags": row["tags"].split(", ") if row["tags"] else [],
+                "price": row["price"],
+                "available": bool(row["available"]),
+                "url": row["url"],
+                "image": row["image"],
+                # bm25 is lower-is-better; flip it so higher means more relevant
+                "score": round(-row["score"], 6) if row["score"] is not None else None,
+            })
+
+        return {
+            "results": hits[:limit],
+            "limit": limit,
+            "offset": offset,
+            "has_more": len(hits) > limit,
+        }
+
+
+def catch_up_search_index(index: Optional[ProductSearchIndex] = None) -> Dict[str, int]:
+    """
+    Index catalogs saved since the last pass, by this node or any other.
+
+    Reads brand_insights rows whose updated_at is at or after the watermark
+    (less the overlap); the first pass on an empty index reads them all.
+    Only stores whose updated_at differs from the one last indexed have their
+    catalog loaded, and index_store only rewrites products that changed.
+    """
+    index = index or get_search_index()
+    since = index.watermark()
+    if since is not None:
+        since -= timedelta(seconds=SEARCH_INDEX_SYNC_OVERLAP_SECONDS)
+
+    totals = {"stores": 0, "indexed": 0, "removed": 0, "unchanged": 0}
+    db = new_session()
+    try:
+        candidates = [
+            row for row in iter_rows(
+                db,
+                [BrandInsightsDB.store_url, BrandInsightsDB.updated_at, BrandInsightsDB.scraping_success],
+                updated_since=since
+            )
+            if row.scraping_success and row.updated_at is not None
+        ]
+        synced = index.synced_versions([row.store_url for row in candidates])
+        changed = [row.id for row in candidates if synced.get(row.store_url) != row.updated_at.isoformat()]
+
+        for start in range(0, len(changed), SEARCH_INDEX_SYNC_BATCH):
+            rows = db.query(
+                BrandInsightsDB.store_url, BrandInsightsDB.updated_at, BrandInsightsDB.product_catalog
+            ).filter(BrandInsightsDB.id.in_(changed[start:start + SEARCH_INDEX_SYNC_BATCH]))
+            for row in rows:
+                try:
+                    products = [Product(**product) for product in row.product_catalog or []]
+                    stats = index.index_store(row.store_url, products)
+                    index.mark_synced(row.store_url, row.updated_at)
+                except Exception as e:
+                    print(f"Error catching up search index for {row.store_url}: {e}")
+                    continue
+                totals["stores"] += 1
+                for key, count in stats.items():
+                    totals[key] += count
+    finally:
+        db.close()
+    return totals
+
+
+class SearchIndexSync:
+    """
+    Background loop running catch_up_search_index every interval, so this
+    node's index follows saves made by other nodes and before a redeploy
+    replaced the index file.
+    """
+
+    def __init__(self, interval: float = SEARCH_INDEX_SYNC_SECONDS):
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="search-index-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                totals = catch_up_search_index()
+                if totals["stores"]:
+                    print(f"Search index caught up: {totals}")
+            except Exception as e:
+                print(f"Search index catch-up failed: {e}")
+            self._stopped.wait(self.interval)
+
+
+@lru_cache(maxsize=None)
+def get_search_index() -> ProductSearchIndex:
+    """Shared search index, opened on first use"""
+    return ProductSearchIndex()
@@ -1,50 +1,61 @@
 import requests
 import json
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
 import re
-import time
 
 # Update imports to be relative
 from ..core.models import Product, FAQ, SocialHandle, ContactInfo, Policy, ImportantLink, BrandContext, BrandInsights
-from .gemini_service import GeminiService
+from .gemini_service import GeminiService, get_gemini_service
+from .html_parsing import minify_html, parse_homepage, parse_policy_page, run_parser
+from .site_crawler import SiteCrawler
+from .host_health import MAX_JSON_BYTES, HealthTrackingSession
+
+# Concurrent Gemini extractions per scrape
+LLM_WORKERS = int(os.getenv("SCRAPER_LLM_WORKERS", "4"))
+
+# Policy slot for a crawled policy page, matched against its URL and title
+POLICY_SLOTS = [
+    ('privacy_policy', re.compile(r'privacy', re.I)),
+    ('refund_policy', re.compile(r'refund', re.I)),
+    ('return_policy', re.compile(r'return', re.I)),
+    ('shipping_policy', re.compile(r'shipping|delivery', re.I)),
+    ('terms_of_service', re.compile(r'terms', re.I)),
+]
+
+# Value of each Gemini-extracted section when its extraction fails
+EMPTY_LLM_SECTIONS = {
+    'brand_context': None,
+    'faqs': [],
+    'contact_info': None,
+    'social_handles': [],
+}
 
 class ShopifyScraper:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, gemini_service: Optional[GeminiService] = None):
+        # Shared per-host circuit breaker, adaptive timeouts and pooled connections
+        self.session = HealthTrackingSession()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
-        self.gemini_service = GeminiService()
-    
-    def is_shopify_store(self, url: str) -> bool:
-        """Check if the given URL is a Shopify store"""
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            # Check for Shopify indicators
-            shopify_indicators = [
-                'Shopify.shop',
-                'shopify-section',
-                'cdn.shopify.com',
-                'myshopify.com',
-                'Shopify.theme',
-                'shopify-features'
-            ]
-            
-            content = response.text.lower()
-            return any(indicator.lower() in content for indicator in shopify_indicators)
-        except Exception as e:
-            print(f"Error checking if Shopify store: {e}")
-            return False
+        self._gemini_service = gemini_service
+        self.crawler = SiteCrawler(self.session)
+
+    @property
+    def gemini_service(self) -> GeminiService:
+        # Resolved lazily so the scraper can be built without an API key
+        if self._gemini_service is None:
+            self._gemini_service = get_gemini_service()
+        return self._gemini_service
     
     def fetch_products_json(self, base_url: str) -> List[Dict[str, Any]]:
         """Fetch products from /products.json endpoint"""
         try:
             products_url = urljoin(base_url, '/products.json')
-            response = self.session.get(products_url, timeout=15)
+            response = self.session.get_capped(products_url, max_bytes=MAX_JSON_BYTES, truncate=False, timeout=15)
             response.raise_for_status()
             
             data = response.json()
@@ -72,7 +83,7 @@ class ShopifyScraper:
                 id=product_data.get('id'),
                 title=product_data.get('title', ''),
                 handle=product_data.get('handle', ''),
-                description=product_data.get('body_html', ''),
+                description=minify_html(product_data.get('body_html')),
                 price=price,
                 compare_at_price=compare_at_price,
                 vendor=product_data.get('vendor', ''),
@@ -81,34 +92,35 @@ class ShopifyScraper:
                 images=images,
                 variants=variants,
                 available=any(variant.get('available', False) for variant in variants),
-                url=urljoin(base_url, f"/products/{product_data.get('handle', '')}")
+                url=urljoin(base_url, f"/products/{product_data.get('handle', '')}"),
+                updated_at=product_data.get('updated_at')
             )
         except Exception as e:
             print(f"Error parsing product: {e}")
             return None
     
-    def fetch_page_content(self, url: str) -> Tuple[str, BeautifulSoup]:
-        """Fetch and parse page content"""
+    def fetch_page_content(self, url: str) -> bytes:
+        """Fetch raw page content, capped at MAX_PAGE_BYTES; empty bytes on failure"""
         try:
-            response = self.session.get(url, timeout=15)
+            response = self.session.get_capped(url, timeout=15)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            return response.text, soup
+            return response.content
         except Exception as e:
             print(f"Error fetching page content from {url}: {e}")
-            return "", None
+            return b""
+
+    @staticmethod
+    def decode_html(html: bytes) -> str:
+        return html.decode('utf-8', errors='replace')
     
-    def extract_hero_products(self, soup: BeautifulSoup, all_products: List[Product]) -> List[Product]:
-        """Extract hero products from homepage"""
+    def extract_hero_products(self, hero_handles: List[str], all_products: List[Product]) -> List[Product]:
+        """Extract hero products from the product handles linked on the homepage"""
         hero_products = []
         
         if not all_products:
             return []
 
-        product_links = soup.find_all('a', href=re.compile(r'/products/'))
-        hero_handles = {urlparse(link['href']).path.split('/')[-1] for link in product_links}
-        
+        hero_handles = set(hero_handles)
         for product in all_products:
             if product.handle in hero_handles:
                 hero_products.append(product)
@@ -133,16 +145,14 @@ class ShopifyScraper:
         for name, path in policy_paths.items():
             try:
                 policy_url = urljoin(base_url, path)
-                html_content, soup = self.fetch_page_content(policy_url)
+                html = self.fetch_page_content(policy_url)
                 
-                if soup:
-                    title = soup.find('h1').get_text(strip=True) if soup.find('h1') else name.replace('_', ' ').title()
-                    content = str(soup.find('div', class_='rte'))
-                    
+                if html:
+                    parsed = run_parser(parse_policy_page, html)
                     policies[name] = Policy(
-                        title=title,
+                        title=parsed["title"] or name.replace('_', ' ').title(),
                         url=policy_url,
-                        content=content
+                        content=parsed["content"]
                     )
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 404:
@@ -154,25 +164,24 @@ class ShopifyScraper:
         
         return policies
 
-    def extract_important_links(self, soup: BeautifulSoup, base_url: str) -> List[ImportantLink]:
-        """Extract important links from the website"""
-        links = []
-        # Common link locations: header, footer, nav
-        nav_elements = soup.find_all(['nav', 'header', 'footer'])
-        
-        for element in nav_elements:
-            for a in element.find_all('a', href=True):
-                href = a['href']
-                text = a.get_text(strip=True)
-                
-                if not text or href.startswith('#') or href.startswith('mailto:') or href.startswith('tel:'):
-                    continue
-                
-                full_url = urljoin(base_url, href)
-                
-                # Avoid duplicates
-                if not any(link.url == full_url for link in links):
-                    links.append(ImportantLink(title=text, url=full_url))
+    def match_crawled_policies(self, pages: List[Dict[str, Any]], found: Dict[str, Policy]) -> Dict[str, Policy]:
+        """Assign crawled policy pages to policy slots the standard paths did not fill"""
+        policies = {}
+        for page in pages:
+            label = f"{page['url']} {page['title'] or ''}"
+            for name, pattern in POLICY_SLOTS:
+                if name not in found and name not in policies and pattern.search(label):
+                    policies[name] = Policy(
+                        title=page["title"] or name.replace('_', ' ').title(),
+                        url=page["url"],
+                        content=page["text"]
+                    )
+                    break
+        return policies
+
+    def extract_important_links(self, nav_links: List[Tuple[str, str]], base_url: str) -> List[ImportantLink]:
+        """Build important links from the parsed header, nav and footer links"""
+        links = [ImportantLink(title=text, url=full_url) for text, full_url in nav_links]
 
         # Add common but potentially unlinked paths
         common_paths = ['/pages/about-us', '/pages/contact', '/blogs']
@@ -188,111 +197,161 @@ class ShopifyScraper:
 
         return links
 
-    def scrape_store(self, store_url: str) -> BrandInsights:
-        """Main method to scrape Shopify store"""
+    def _extract_brand_context(self, html_content: str, store_url: str, store_name: Optional[str]) -> BrandContext:
+        brand_context_data = self.gemini_service.extract_brand_context(html_content, store_url)
+        return BrandContext(
+            store_url=store_url,
+            store_name=brand_context_data.get('store_name', store_name),
+            brand_description=brand_context_data.get('brand_description'),
+            about_us=brand_context_data.get('about_us'),
+            mission_statement=brand_context_data.get('mission_statement'),
+            founded_year=brand_context_data.get('founded_year'),
+            headquarters=brand_context_data.get('headquarters')
+        )
+
+    def _extract_faqs(self, html_content: str) -> List[FAQ]:
+        faqs_data = self.gemini_service.extract_faqs(html_content)
+        return [
+            FAQ(**faq)
+            for faq in faqs_data
+            if isinstance(faq, dict) and 'question' in faq and 'answer' in faq
+        ]
+
+    def _extract_contact_info(self, html_content: str) -> Optional[ContactInfo]:
+        contact_data = self.gemini_service.extract_contact_info(html_content)
+        return ContactInfo(**contact_data) if contact_data else None
+
+    def _extract_social_handles(self, html_content: str) -> List[SocialHandle]:
+        social_data = self.gemini_service.extract_social_handles(html_content)
+        return [SocialHandle(**social) for social in social_data if isinstance(social, dict) and social.get("url")]
+
+    def iter_scrape_sections(self, store_url: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Scrape a store section by section.
+
+        Yields (section, fields) pairs where fields are BrandInsights attributes.
+        Cheap sections come first; the Gemini extractions run concurrently from
+        the moment the homepage is available and are yielded as each finishes.
+        The last section is always "status" with errors and scraping_success.
+        """
         errors = []
-        start_time = time.time()
-        
+
+        # Validate and clean URL
+        parsed_url = urlparse(store_url)
+        if not parsed_url.scheme:
+            store_url = 'https://' + store_url
+        yield "store_url", {"store_url": store_url}
+
+        # Fetch the homepage once and parse it off the GIL
+        html = self.fetch_page_content(store_url)
+        homepage = run_parser(parse_homepage, html, store_url) if html else None
+
+        # Check if it's a Shopify store
+        if not homepage or not homepage["is_shopify"]:
+            errors.append("URL does not appear to be a Shopify store")
+
+        if not homepage:
+            errors.append("Failed to fetch homepage content")
+            yield "status", {"scraping_success": False, "errors": errors}
+            return
+
+        html_content = self.decode_html(html)
+        store_name = homepage["store_name"]
+        yield "store_name", {"store_name": store_name}
+
+        # Crawl FAQ, contact and about pages and start the Gemini extractions now,
+        # so they overlap with the HTTP work below. One extra worker for the crawl,
+        # which is submitted first so extractions waiting on it cannot starve it.
+        executor = ThreadPoolExecutor(max_workers=LLM_WORKERS + 1)
         try:
-            # Validate and clean URL
-            parsed_url = urlparse(store_url)
-            if not parsed_url.scheme:
-                store_url = 'https://' + store_url
-            
-            # Check if it's a Shopify store
-            if not self.is_shopify_store(store_url):
-                errors.append("URL does not appear to be a Shopify store")
-            
-            # Fetch homepage content
-            html_content, soup = self.fetch_page_content(store_url)
-            
-            if not soup:
-                errors.append("Failed to fetch homepage content")
-                return BrandInsights(
-                    store_url=store_url,
-                    scraping_success=False,
-                    errors=errors
-                )
-            
-            # Extract store name
-            store_name = None
-            title_tag = soup.find('title')
-            if title_tag:
-                store_name = title_tag.get_text(strip=True)
-            
+            crawl_future = executor.submit(self.crawler.crawl, store_url, homepage["nav_links"])
+
+            def crawled_pages(page_type: str) -> List[Dict[str, Any]]:
+                try:
+                    return crawl_future.result().get(page_type, [])
+                except Exception as e:
+                    print(f"Error crawling {store_url}: {e}")
+                    return []
+
+            def page_content(page_type: str) -> str:
+                """Crawled page text for one extractor, followed by the homepage as fallback context"""
+                return "\n\n".join([page["text"] for page in crawled_pages(page_type)] + [html_content])
+
+            llm_futures = {
+                executor.submit(lambda: self._extract_brand_context(page_content("about"), store_url, store_name)): "brand_context",
+                executor.submit(lambda: self._extract_faqs(page_content("faq"))): "faqs",
+                executor.submit(lambda: self._extract_contact_info(page_content("contact"))): "contact_info",
+                executor.submit(self._extract_social_handles, html_content): "social_handles",
+            }
+
             # Fetch products
             products_data = self.fetch_products_json(store_url)
             products = []
-            
+
             for product_data in products_data:
                 product = self.parse_product(product_data, store_url)
                 if product:
                     products.append(product)
-            
+            yield "products", {"product_catalog": products, "total_products": len(products)}
+
             # Extract hero products
-            hero_products = self.extract_hero_products(soup, products)
-            
-            # Extract policies
-            policies = self.extract_policies(store_url)
-            
+            yield "hero_products", {"hero_products": self.extract_hero_products(homepage["product_handles"], products)}
+
             # Extract important links
-            important_links = self.extract_important_links(soup, store_url)
-            
-            # Use Gemini to extract structured data
-            brand_context_data = self.gemini_service.extract_brand_context(html_content, store_url)
-            brand_context = BrandContext(
-                store_url=store_url,
-                store_name=brand_context_data.get('store_name', store_name),
-                brand_description=brand_context_data.get('brand_description'),
-                about_us=brand_context_data.get('about_us'),
-                mission_statement=brand_context_data.get('mission_statement'),
-                founded_year=brand_context_data.get('founded_year'),
-                headquarters=brand_context_data.get('headquarters')
-            )
-            
-            # Extract FAQs using Gemini
-            faqs_data = self.gemini_service.extract_faqs(html_content)
-            faqs = [
-                FAQ(**faq)
-                for faq in faqs_data
-                if isinstance(faq, dict) and 'question' in faq and 'answer' in faq
-            ]
-            
-            # Extract contact info using Gemini
-            contact_data = self.gemini_service.extract_contact_info(html_content)
-            contact_info = ContactInfo(**contact_data) if contact_data else None
-            
-            # Extract social handles using Gemini
-            social_data = self.gemini_service.extract_social_handles(html_content)
-            social_handles = [SocialHandle(**social) for social in social_data if isinstance(social, dict) and social.get("url")]
-            
-            # Create BrandInsights object
-            brand_insights = BrandInsights(
-                store_url=store_url,
-                store_name=store_name,
-                brand_context=brand_context,
-                product_catalog=products,
-                hero_products=hero_products,
-                total_products=len(products),
-                privacy_policy=policies.get('privacy_policy'),
-                return_policy=policies.get('return_policy'),
-                refund_policy=policies.get('refund_policy'),
-                shipping_policy=policies.get('shipping_policy'),
-                terms_of_service=policies.get('terms_of_service'),
-                faqs=faqs,
-                contact_info=contact_info,
-                social_handles=social_handles,
-                important_links=important_links,
-                scraping_success=True,
-                errors=errors
-            )
-            
-            return brand_insights
-            
+            yield "important_links", {"important_links": self.extract_important_links(homepage["nav_links"], store_url)}
+
+            # Extract policies, filling gaps from policy pages found by the crawler
+            policies = self.extract_policies(store_url)
+            policies.update(self.match_crawled_policies(crawled_pages("policy"), policies))
+            yield "policies", dict(policies)
+
+            # A failed extraction (Gemini down, no API key) leaves its section
+            # empty instead of discarding the data fetched above
+            for future in as_completed(llm_futures):
+                section = llm_futures[future]
+                try:
+                    value = future.result()
+                except Exception as e:
+                    print(f"Error extracting {section} for {store_url}: {e}")
+                    errors.append(f"Failed to extract {section}: {str(e)}")
+                    value = EMPTY_LLM_SECTIONS[section]
+                yield section, {section: value}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        yield "status", {"scraping_success": True, "errors": errors}
+
+    def scrape_store(
+        self,
+        store_url: str,
+        on_section: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> BrandInsights:
+        """
+        Main method to scrape Shopify store.
+
+        on_section, if given, is called with each (section, fields) pair from
+        iter_scrape_sections as soon as it is ready.
+        """
+        fields = {"store_url": store_url}
+
+        try:
+            for section, section_fields in self.iter_scrape_sections(store_url):
+                fields.update(section_fields)
+                if on_section:
+                    on_section(section, section_fields)
+
+            return BrandInsights(**fields)
+
         except Exception as e:
+            errors = fields.get("errors", [])
             errors.append(f"Scraping failed: {str(e)}")
             return BrandInsights(
-                store_url=store_url,
+                store_url=fields["store_url"],
                 scraping_success=False,
                 errors=errors
             )
+
+@lru_cache(maxsize=None)
+def get_scraper() -> ShopifyScraper:
+    """Shared ShopifyScraper, created on first use"""
+    return ShopifyScraper()
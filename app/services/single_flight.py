@@ -0,0 +1,125 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single execution.
+
+    The first caller for a key starts the work in the threadpool; callers that
+    arrive while it is running await the same result. Semantics:
+
+    - Cancellation: a cancelled caller only stops waiting. The shared work keeps
+      running for the remaining callers and its result is still memoized.
+    - Errors: an exception is raised to every caller attached to that flight and
+      is never memoized, so the next call starts a fresh attempt.
+    - Memo: results accepted by `memoize` are served for `memo_seconds` after
+      completion without starting new work.
+    - Feeds: a run started with `feed=True` gets the publish method of the
+      key's SectionFeed as its last argument, so callers can follow its
+      progress, not just await the result.
+    """
+
+    def __init__(self, memo_seconds: float = 0):
+        self.memo_seconds = memo_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._memo: Dict[str, Tuple[float, Any]] = {}
+        self._feeds: Dict[str, "SectionFeed"] = {}
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        memoize: Optional[Callable[[Any], bool]] = None,
+        feed: bool = False
+    ) -> Any:
+        self._prune_memo()
+        if key in self._memo:
+            # No run can be in flight while a result is memoized
+            self._feeds.pop(key, None)
+            return self._memo[key][1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            run_feed = self.feed(key) if feed else None
+            if run_feed is not None:
+                args += (run_feed.publish,)
+            task = asyncio.ensure_future(self._execute(key, fn, args, memoize, run_feed))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+
+        return await asyncio.shield(task)
+
+    def feed(self, key: str) -> "SectionFeed":
+        """Feed of the in-flight run for key, or of the next one to start"""
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = SectionFeed()
+        return feed
+
+    async def _execute(self, key: str, fn: Callable[..., Any], args: tuple, memoize, feed):
+        try:
+            result = await run_in_threadpool(fn, *args)
+        finally:
+            self._inflight.pop(key, None)
+            if feed is not None and self._feeds.get(key) is feed:
+                del self._feeds[key]
+
+        if self.memo_seconds > 0 and (memoize is None or memoize(result)):
+            self._memo[key] = (time.monotonic(), result)
+        return result
+
+    def _prune_memo(self):
+        now = time.monotonic()
+        expired = [key for key, (stored_at, _) in self._memo.items() if now - stored_at >= self.memo_seconds]
+        for key in expired:
+            del self._memo[key]
+
+
+class SectionFeed:
+    """
+    Sections published by a running job, replayed to every follower.
+
+    publish() may be called from any thread; it hands the section to the event
+    loop the feed was created on. Followers iterate on that loop and see every
+    section from the first one, whenever they attach.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.sections: List[Tuple[str, Any]] = []
+        self._changed = asyncio.Event()
+
+    def publish(self, section: str, fields: Any):
+        self.loop.call_soon_threadsafe(self._append, section, fields)
+
+    def _append(self, section: str, fields: Any):
+        self.sections.append((section, fields))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self, until: asyncio.Future) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield published sections until `until` completes and all are yielded"""
+        index = 0
+        while True:
+            while index < len(self.sections):
+                yield self.sections[index]
+                index += 1
+            if until.done():
+                return
+            changed = asyncio.ensure_future(self._changed.wait())
+            try:
+                await asyncio.wait({changed, until}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                changed.cancel()
+
+
+def _consume_exception(task: asyncio.Future):
+    # Every attached caller may have been cancelled; retrieve the exception so
+    # asyncio does not log it as never retrieved.
+    if not task.cancelled():
+        task.exception()
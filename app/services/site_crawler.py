@@ -0,0 +1,173 @@
+import heapq
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from ..core.urls import canonicalize_url, same_site
+from .html_parsing import parse_content_page, run_parser
+from .host_health import HealthTrackingSession
+
+# Page budget per store, including pages that turn out not to be useful
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "6"))
+# Simultaneous requests to one store
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "2"))
+# How many link hops away from the homepage the crawler may go
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+# Pages kept per page type; the best-ranked ones win
+CRAWL_MAX_PER_TYPE = int(os.getenv("CRAWL_MAX_PER_TYPE", "2"))
+
+# Checked in order, so a URL like /pages/contact-faq counts as faq
+PAGE_PATTERNS = [
+    ("faq", re.compile(r"faq|frequently|questions|\bhelp\b", re.I)),
+    ("contact", re.compile(r"contact|support|customer[-_ ]?(service|care)|get[-_ ]in[-_ ]touch", re.I)),
+    ("about", re.compile(r"about|our[-_ ]story|\bstory\b|mission|who[-_ ]we[-_ ]are", re.I)),
+    ("policy", re.compile(r"polic(y|ies)|terms|shipping|delivery|returns?|refunds?|privacy", re.I)),
+]
+
+# Lower is fetched first. Standard /policies/* pages are fetched separately by
+# the scraper, so policy pages found by the crawler only fill in gaps.
+PAGE_PRIORITY = {"faq": 0, "contact": 0, "about": 1, "policy": 2}
+
+# Fetched even when not linked from the homepage
+COMMON_PAGES = [
+    ("FAQ", "/pages/faq"),
+    ("Contact", "/pages/contact"),
+    ("About Us", "/pages/about-us"),
+]
+
+# Crawlers commonly stop reading robots.txt after 500 KiB
+ROBOTS_MAX_BYTES = 500 * 1024
+
+# Paths that are never content pages, plus the standard /policies/* pages the
+# scraper already fetches
+SKIP_PATHS = re.compile(r"^/(products|collections|cart|account|checkout|search|cdn|policies)(/|$)", re.I)
+
+
+def classify_page(url: str, title: str = "") -> Optional[str]:
+    """Page type from its URL path and link or page title, or None when not useful"""
+    path = urlsplit(url).path
+    for page_type, pattern in PAGE_PATTERNS:
+        if pattern.search(path):
+            return page_type
+    for page_type, pattern in PAGE_PATTERNS:
+        if title and pattern.search(title):
+            return page_type
+    return None
+
+
+class SiteCrawler:
+    """
+    Bounded crawler for a store's content pages.
+
+    Starts from the homepage's header, nav and footer links, fetches the
+    highest-priority FAQ, contact, about and policy pages first, and stops at
+    the page budget. URLs are canonicalized and deduplicated, robots.txt is
+    honoured, and requests to the store never exceed the concurrency cap.
+    """
+
+    def __init__(
+        self,
+        session: HealthTrackingSession,
+        max_pages: int = CRAWL_MAX_PAGES,
+        concurrency: int = CRAWL_CONCURRENCY,
+        max_depth: int = CRAWL_MAX_DEPTH,
+        max_per_type: int = CRAWL_MAX_PER_TYPE,
+        timeout: float = 10
+    ):
+        self.session = session
+        self.max_pages = max_pages
+        self.concurrency = max(concurrency, 1)
+        self.max_depth = max_depth
+        self.max_per_type = max_per_type
+        self.timeout = timeout
+
+    def load_robots(self, base_url: str) -> Optional[RobotFileParser]:
+        """Fetch and parse robots.txt; None means everything is allowed"""
+        robots_url = urljoin(base_url, "/robots.txt")
+        try:
+            response = self.session.get_capped(robots_url, max_bytes=ROBOTS_MAX_BYTES, timeout=5)
+            if response.status_code != 200:
+                return None
+            robots = RobotFileParser(robots_url)
+            robots.parse(response.text.splitlines())
+            return robots
+        except Exception as e:
+            print(f"Error fetching robots.txt from {robots_url}: {e}")
+            return None
+
+    def crawl(self, base_url: str, seed_links: List[Tuple[str, str]]) -> Dict[str, List[Dict]]:
+        """
+        Crawl content pages reachable from seed_links.
+
+        Returns {page_type: [page, ...]} where each page is a dict with
+        url, title and text, best-ranked first.
+        """
+        robots = self.load_robots(base_url)
+        user_agent = self.session.headers.get("User-Agent", "*")
+
+        frontier: List[Tuple[int, int, int, str, str]] = []
+        seen = set()
+        counter = 0
+
+        def enqueue(title: str, url: str, depth: int):
+            nonlocal counter
+            url = canonicalize_url(url, base_url)
+            if not url or url in seen or not same_site(url, base_url):
+                return
+            if SKIP_PATHS.match(urlsplit(url).path):
+                return
+            page_type = classify_page(url, title)
+            if page_type is None:
+                return
+            seen.add(url)
+            if robots is not None and not robots.can_fetch(user_agent, url):
+                return
+            counter += 1
+            heapq.heappush(frontier, (PAGE_PRIORITY[page_type] + depth, counter, depth, url, page_type))
+
+        seen.add(canonicalize_url(base_url))
+        for title, url in seed_links:
+            enqueue(title, url, 0)
+        for title, path in COMMON_PAGES:
+            enqueue(title, urljoin(base_url, path), 0)
+
+        pages: Dict[str, List[Dict]] = {}
+        fetched = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while frontier and fetched < self.max_pages:
+                batch = []
+                while frontier and len(batch) < self.concurrency and fetched + len(batch) < self.max_pages:
+                    _, _, depth, url, page_type = heapq.heappop(frontier)
+                    # Skip types that are already full before spending a request
+                    if len(pages.get(page_type, [])) < self.max_per_type:
+                        batch.append((depth, url, page_type))
+                if not batch:
+                    continue
+
+                results = executor.map(lambda item: self.fetch_page(item[1]), batch)
+                for (depth, url, page_type), page in zip(batch, results):
+                    fetched += 1
+                    if page is None or not page["text"]:
+                        continue
+
+                    if len(pages.setdefault(page_type, [])) < self.max_per_type:
+                        pages[page_type].append({"url": url, "title": page["title"], "text": page["text"]})
+
+                    if depth < self.max_depth:
+                        for title, link in page["links"]:
+                            enqueue(title, link, depth + 1)
+
+        return pages
+
+    def fetch_page(self, url: str) -> Optional[Dict]:
+        try:
+            response = self.session.get_capped(url, timeout=self.timeout)
+            response.raise_for_status()
+            return run_parser(parse_content_page, response.content, url)
+        except Exception as e:
+            print(f"Error crawling {url}: {e}")
+            return None
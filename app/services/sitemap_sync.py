@@ -0,0 +1,153 @@
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from ..core.models import Product
+
+# Concurrent /products/<handle>.json fetches per sync
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "4"))
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def is_newer(lastmod: Optional[str], updated_at: Optional[str]) -> bool:
+    """True when the sitemap lastmod is later than what we stored, or either is unknown"""
+    lastmod_at, updated = parse_timestamp(lastmod), parse_timestamp(updated_at)
+    if lastmod_at is None or updated is None:
+        return True
+    try:
+        return lastmod_at > updated
+    except TypeError:
+        # One side is naive; compare wall-clock values
+        return lastmod_at.replace(tzinfo=None) > updated.replace(tzinfo=None)
+
+
+class SitemapSync:
+    """
+    Delta product sync driven by the store's sitemap.
+
+    Shopify lists every product in sitemap_products_N.xml with a <lastmod>.
+    The sitemaps are parsed incrementally, compared against the stored
+    catalog, and only new or changed products are refetched from
+    /products/<handle>.json. Products missing from a complete sitemap read are
+    reported as deleted.
+    """
+
+    def __init__(self, scraper, concurrency: int = SYNC_CONCURRENCY):
+        self.scraper = scraper
+        self.concurrency = max(concurrency, 1)
+
+    def iter_sitemap(self, sitemap_url: str, tag: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """Stream (loc, lastmod) for each <tag> entry of a sitemap without loading it whole"""
+        response = self.scraper.session.get(sitemap_url, timeout=15, stream=True)
+        try:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            for _, element in ET.iterparse(response.raw, events=("end",)):
+                if element.tag != SITEMAP_NS + tag:
+                    continue
+                loc = element.findtext(SITEMAP_NS + "loc")
+                lastmod = element.findtext(SITEMAP_NS + "lastmod")
+                element.clear()
+                if loc:
+                    yield loc.strip(), lastmod
+        finally:
+            response.close()
+
+    def iter_product_entries(self, base_url: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """(handle, lastmod) for every product in the store's product sitemaps"""
+        index_url = urljoin(base_url, "/sitemap.xml")
+        product_sitemaps = [
+            loc for loc, _ in self.iter_sitemap(index_url, "sitemap")
+            if "sitemap_products" in urlparse(loc).path
+        ]
+        # Without a product sitemap every stored product would look deleted
+        if not product_sitemaps:
+            raise ValueError(f"No product sitemap listed in {index_url}")
+
+        for sitemap_url in product_sitemaps:
+            for loc, lastmod in self.iter_sitemap(sitemap_url, "url"):
+                parts = urlparse(loc).path.rstrip("/").split("/")
+                if len(parts) >= 2 and parts[-2] == "products":
+                    yield parts[-1], lastmod
+
+    def fetch_product(self, base_url: str, handle: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.scraper.session.get_capped(
+                urljoin(base_url, f"/products/{handle}.json"), truncate=False, timeout=15
+            )
+            response.raise_for_status()
+            return response.json().get("product")
+        except Exception as e:
+            print(f"Error fetching product {handle}: {e}")
+            return None
+
+    def sync(self, base_url: str, stored_products: List[Product]) -> Dict[str, Any]:
+        """
+        Bring stored_products up to date with the live store.
+
+        Returns the merged catalog (sitemap order, unchanged products reused)
+        with the handles that were added, updated and deleted. Products whose
+        refetch fails keep their stored version. Any sitemap failure raises,
+        so deletions are only reported from a complete read.
+        """
+        stored = {product.handle: product for product in stored_products}
+
+        entries: List[Tuple[str, Optional[str]]] = []
+        seen = set()
+        for handle, lastmod in self.iter_product_entries(base_url):
+            if handle not in seen:
+                seen.add(handle)
+                entries.append((handle, lastmod))
+
+        changed = [
+            handle for handle, lastmod in entries
+            if handle not in stored or is_newer(lastmod, stored[handle].updated_at)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            fetched = dict(zip(changed, executor.map(lambda handle: self.fetch_product(base_url, handle), changed)))
+
+        products, added, updated = [], [], []
+        for handle, lastmod in entries:
+            product_data = fetched.get(handle)
+            product = self.scraper.parse_product(product_data, base_url) if product_data else None
+
+            if product is None:
+                if handle in stored:
+                    products.append(stored[handle])
+                continue
+
+            # /products/<handle>.json variants carry no availability flag
+            if not any("available" in variant for variant in product.variants):
+                product.available = stored[handle].available if handle in stored else True
+
+            # Keep the sitemap's lastmod as the watermark if it is ahead of the
+            # product's own timestamp, so the next sync does not refetch it
+            if lastmod and is_newer(lastmod, product.updated_at):
+                product.updated_at = lastmod.strip()
+
+            products.append(product)
+            (updated if handle in stored else added).append(handle)
+
+        deleted = [handle for handle in stored if handle not in seen]
+
+        return {
+            "products": products,
+            "added": added,
+            "updated": updated,
+            "deleted": deleted,
+            "unchanged": len(products) - len(added) - len(updated),
+        }
@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 import warnings
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -13,8 +14,12 @@ import logging
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 # Now we can import from our app packages
-from app.routes.fetch import router as fetch_router
+from app.routes.fetch import router as fetch_router, index_executor, process_queued_store
 from app.core.database import init_db
+from app.core.compression import CompressionMiddleware
+from app.services.html_parsing import shutdown_parse_pool
+from app.services.leases import BATCH_WORKER_CONCURRENCY, LeaseWorker, get_lease_manager
+from app.services.search_index import SEARCH_INDEX_SYNC_SECONDS, SearchIndexSync
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,24 +50,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
+# Negotiated zstd/gzip compression for large JSON payloads
+app.add_middleware(CompressionMiddleware)
+
+# Claims queued stores from the shared lease table; started once the database is up
+batch_worker = LeaseWorker(get_lease_manager(), process_queued_store) if BATCH_WORKER_CONCURRENCY > 0 else None
+
+# Indexes catalogs saved by other nodes into this node's search index
+search_index_sync = SearchIndexSync() if SEARCH_INDEX_SYNC_SECONDS > 0 else None
+
 @retry(
     wait=wait_fixed(5),
     stop=stop_after_attempt(6),
     before_sleep=before_sleep_log(logger, logging.INFO),
 )
-async def startup_event():
-    """
-    Initialize the database connection on startup with retry logic.
-    """
+def connect_database():
+    logger.info("Attempting to connect to the database...")
+    if not init_db():
+        raise RuntimeError("Database initialization failed")
+
+def warm_up_database():
+    """Connect to the database with retry logic, off the startup path."""
     try:
-        logger.info("Attempting to connect to the database...")
-        init_db()
+        connect_database()
         logger.info("Database connection successful.")
+        if batch_worker is not None:
+            batch_worker.start()
+        if search_index_sync is not None:
+            search_index_sync.start()
     except Exception as e:
         logger.error(f"Database connection failed after multiple retries: {e}")
         logger.warning("Application will continue without database persistence.")
 
+@app.on_event("startup")
+async def startup_event():
+    """
+    Start the database warm-up in the background so the server accepts
+    requests immediately on cold start.
+    """
+    threading.Thread(target=warm_up_database, name="db-warmup", daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batch worker and index sync, hand back held leases, finish queued indexing and stop the HTML parser processes."""
+    if batch_worker is not None:
+        batch_worker.stop()
+    if search_index_sync is not None:
+        search_index_sync.stop()
+    get_lease_manager().stop()
+    index_executor.shutdown(wait=True)
+    shutdown_parse_pool()
+
 # Include API router
 app.include_router(fetch_router, prefix="/api")
 
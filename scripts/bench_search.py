@@ -0,0 +1,109 @@
+"""
+Benchmark the product search index on a synthetic catalog.
+
+Builds an index of --products products spread over --stores stores in a
+temporary SQLite file, then reports indexing throughput, the cost of an
+incremental re-index and query latency percentiles for a mix of text,
+filter-only and filtered text queries.
+
+Usage:
+    python scripts/bench_search.py [--products 1000000] [--stores 200] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.models import Product
+from app.services.search_index import ProductSearchIndex
+
+MATERIALS = ["merino", "cotton", "linen", "silk", "cashmere", "denim", "leather", "wool", "bamboo", "hemp"]
+ITEMS = ["sweater", "shirt", "jacket", "sock", "beanie", "scarf", "dress", "trouser", "boot", "tote"]
+ADJECTIVES = ["classic", "organic", "slim", "relaxed", "vintage", "everyday", "premium", "lightweight", "cozy", "tailored"]
+COLOURS = ["black", "navy", "olive", "cream", "rust", "grey", "sand", "forest", "burgundy", "white"]
+VENDORS = [f"Vendor {i}" for i in range(50)]
+
+
+def synthetic_catalog(store: int, count: int, rng: random.Random):
+    products = []
+    for i in range(count):
+        material, item = rng.choice(MATERIALS), rng.choice(ITEMS)
+        colour, adjective = rng.choice(COLOURS), rng.choice(ADJECTIVES)
+        products.append(Product(
+            title=f"{adjective.title()} {colour.title()} {material.title()} {item.title()}",
+            handle=f"{adjective}-{colour}-{material}-{item}-{store}-{i}",
+            description=f"<p>A {adjective} {item} made from {material}. <strong>Colour:</strong> {colour}.</p>",
+            price=f"{rng.uniform(5, 400):.2f}",
+            vendor=rng.choice(VENDORS),
+            product_type=item.title(),
+            tags=[material, colour, rng.choice(ADJECTIVES)],
+            available=rng.random() < 0.85,
+        ))
+    return products
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--stores", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    per_store = max(args.products // args.stores, 1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = ProductSearchIndex(os.path.join(directory, "bench.db"))
+
+        start = time.perf_counter()
+        catalogs = {}
+        for store in range(args.stores):
+            store_url = f"https://store-{store}.example.com"
+            catalogs[store_url] = synthetic_catalog(store, per_store, rng)
+            index.index_store(store_url, catalogs[store_url])
+            # Keep one catalog around for the incremental run; free the rest
+            if store:
+                del catalogs[store_url]
+        elapsed = time.perf_counter() - start
+        total = per_store * args.stores
+        print(f"indexed {total:,} products in {elapsed:.1f}s ({total / elapsed:,.0f} products/s)")
+
+        store_url, catalog = next(iter(catalogs.items()))
+        for product in rng.sample(catalog, max(len(catalog) // 100, 1)):
+            product.price = f"{rng.uniform(5, 400):.2f}"
+        start = time.perf_counter()
+        stats = index.index_store(store_url, catalog)
+        print(f"incremental re-index of {len(catalog):,} products (1% changed): "
+              f"{(time.perf_counter() - start) * 1000:.1f}ms {stats}")
+
+        query_mix = {
+            "text": lambda: dict(query=f"{rng.choice(MATERIALS)} {rng.choice(ITEMS)}"),
+            "prefix": lambda: dict(query=rng.choice(MATERIALS)[:4]),
+            "text+filters": lambda: dict(query=rng.choice(MATERIALS), max_price=80, available=True),
+            "filters only": lambda: dict(min_price=50, max_price=60, available=True),
+            "deep page": lambda: dict(query=rng.choice(MATERIALS), offset=500),
+        }
+        for name, make_query in query_mix.items():
+            timings = []
+            for _ in range(args.queries):
+                kwargs = make_query()
+                start = time.perf_counter()
+                index.search(**kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{name:>14}: p50 {statistics.median(timings):7.2f}ms  "
+                  f"p95 {percentile(timings, 95):7.2f}ms  max {max(timings):7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Measure cold-start cost and fail when it exceeds the budget.
+
+Runs in fresh interpreters so nothing is cached between measurements:
+  - import time of `main` (best of --runs), plus the slowest imported packages
+  - first request latency of GET /health and GET / through the ASGI app
+
+Usage:
+    python scripts/check_startup.py [--runs 5] [--import-budget 2.0] [--request-budget 0.5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Modules that must not be loaded just by importing the app
+LAZY_MODULES = ["google.generativeai", "mysql.connector"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - start
+
+from fastapi.testclient import TestClient
+timings = {}
+with TestClient(main.app) as client:
+    for path in ("/health", "/"):
+        start = time.perf_counter()
+        client.get(path)
+        timings[path] = time.perf_counter() - start
+
+# Written to a file: the app's background threads print to stdout
+with open(sys.argv[1], "w") as out:
+    json.dump({
+        "import_seconds": import_seconds,
+        "first_request_seconds": timings,
+        "eager_modules": [m for m in %r if m in sys.modules],
+    }, out)
+""" % (LAZY_MODULES,)
+
+
+def run_probe():
+    env = dict(os.environ)
+    # The probe must not reach a real database or LLM
+    env.setdefault("SHOPIFY_INSIGHTS_DB_URL", "sqlite://")
+    with tempfile.TemporaryDirectory() as workdir:
+        result_path = os.path.join(workdir, "probe.json")
+        subprocess.run(
+            [sys.executable, "-c", PROBE, result_path],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+        )
+        with open(result_path) as result:
+            return json.load(result)
+
+
+def slowest_imports(limit=10):
+    """Top packages by cumulative import time, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        # Only imports made directly by main; nesting is indented two spaces per level
+        name = name[1:]
+        if name.startswith("  ") and not name.startswith("    "):
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0")))
+    parser.add_argument("--request-budget", type=float, default=float(os.getenv("FIRST_REQUEST_BUDGET_SECONDS", "0.5")))
+    args = parser.parse_args()
+
+    probes = [run_probe() for _ in range(args.runs)]
+    import_seconds = min(p["import_seconds"] for p in probes)
+    first_request = {
+        path: min(p["first_request_seconds"][path] for p in probes)
+        for path in probes[0]["first_request_seconds"]
+    }
+    eager_modules = sorted({m for p in probes for m in p["eager_modules"]})
+
+    print(f"import main: {import_seconds:.3f}s (budget {args.import_budget:.3f}s)")
+    for path, seconds in first_request.items():
+        print(f"first GET {path}: {seconds:.3f}s (budget {args.request_budget:.3f}s)")
+    print("slowest imports:")
+    for cumulative_us, name in slowest_imports():
+        print(f"  {cumulative_us / 1e6:.3f}s  {name}")
+
+    failures = []
+    if import_seconds > args.import_budget:
+        failures.append("import time over budget")
+    if any(seconds > args.request_budget for seconds in first_request.values()):
+        failures.append("first request over budget")
+    if eager_modules:
+        failures.append(f"loaded eagerly at import: {', '.join(eager_modules)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Export stored insights from the database without going through the API.
+
+Streams every stored store, or every stored product, as NDJSON, CSV or
+Parquet with constant memory. Use --updated-since with the time of the
+previous run for incremental exports.
+
+Usage:
+    python scripts/export_insights.py [--level stores|products] [--format ndjson|csv|parquet]
+                                      [--updated-since 2026-01-01T00:00:00] [--store-url URL ...]
+                                      [--output FILE]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.urls import normalize_store_url
+from app.services.export import EXPORT_FORMATS, EXPORT_LEVELS, export_insights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--level", choices=sorted(EXPORT_LEVELS), default="stores")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--updated-since", type=datetime.fromisoformat, default=None,
+                        help="only stores saved (scraped or synced) at or after this ISO timestamp")
+    parser.add_argument("--store-url", action="append", default=None, help="limit to this store (repeatable)")
+    parser.add_argument("--output", "-o", default="-", help="output file, - for stdout")
+    args = parser.parse_args()
+
+    if args.format == "parquet" and args.output == "-" and sys.stdout.isatty():
+        parser.error("refusing to write Parquet to a terminal; use --output")
+
+    store_urls = [normalize_store_url(url) for url in args.store_url] if args.store_url else None
+    started_at = datetime.now()
+    start = time.time()
+
+    try:
+        chunks = export_insights(args.level, args.format, args.updated_since, store_urls)
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    written = 0
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+    print(
+        f"Exported {written / 1e6:.1f} MB in {time.time() - start:.1f}s; "
+        f"next incremental run: --updated-since {started_at.isoformat(timespec='seconds')}",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
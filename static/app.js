@@ -30,7 +30,7 @@ document.addEventListener('DOMContentLoaded', function() {
         results.style.display = 'none';
         
         try {
-            const response = await fetch('/api/scrape', {
+            const response = await fetch('/api/scrape/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -42,23 +42,41 @@ document.addEventListener('DOMContentLoaded', function() {
                 })
             });
 
-            const data = await response.json();
-            
             if (!response.ok) {
+                const data = await response.json();
                 throw new Error(data.detail || 'Failed to analyze store');
             }
 
-            // Hide loading and show results
-            loading.style.display = 'none';
-            results.style.display = 'block';
-            
-            // Display results
-            displayResults(data);
-            
-            // Show competitors tab if analysis was included
-            if (data.competitor_analysis) {
-                competitorsTab.style.display = 'block';
-            }
+            // Sections are rendered as they arrive; the first one hides the spinner
+            const data = {
+                data: emptyInsights(storeUrl),
+                competitor_analysis: null,
+                processing_time: '…'
+            };
+
+            await readEventStream(response, function(event, payload) {
+                if (event === 'error') {
+                    throw new Error(payload.detail || 'Failed to analyze store');
+                }
+
+                if (event === 'complete') {
+                    data.processing_time = payload.processing_time;
+                    data.data.errors = payload.errors;
+                } else if (event === 'competitor_analysis') {
+                    data.competitor_analysis = payload.competitor_analysis;
+                } else {
+                    Object.assign(data.data, payload);
+                }
+
+                loading.style.display = 'none';
+                results.style.display = 'block';
+                displayResults(data);
+
+                // Show competitors tab if analysis was included
+                if (data.competitor_analysis) {
+                    competitorsTab.style.display = 'block';
+                }
+            });
             
         } catch (error) {
             loading.style.display = 'none';
@@ -66,6 +84,57 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    function emptyInsights(storeUrl) {
+        return {
+            store_url: storeUrl,
+            store_name: null,
+            brand_context: null,
+            product_catalog: [],
+            hero_products: [],
+            total_products: 0,
+            faqs: [],
+            contact_info: null,
+            social_handles: [],
+            important_links: [],
+            scraped_at: new Date().toISOString(),
+            errors: []
+        };
+    }
+
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let dataLines = [];
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        dataLines.push(line.slice(6));
+                    }
+                });
+
+                if (dataLines.length) {
+                    onEvent(event, JSON.parse(dataLines.join('\n')));
+                }
+            }
+        }
+    }
+
     function displayResults(data) {
         const insights = data.data;
         
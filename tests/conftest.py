@@ -0,0 +1,6 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Never touch a configured database; every test builds its own
+os.environ.setdefault("SHOPIFY_INSIGHTS_DB_URL", "sqlite://")
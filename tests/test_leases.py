@@ -0,0 +1,217 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, StoreLeaseDB
+from app.services.leases import DONE, FAILED, PENDING, RUNNING, LeaseManager, LeaseWorker
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'leases.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[StoreLeaseDB.__table__])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_manager(session_factory):
+    managers = []
+
+    def make(owner: str, **kwargs) -> LeaseManager:
+        kwargs.setdefault("heartbeat_interval", 3600)
+        manager = LeaseManager(owner=owner, session_factory=session_factory, **kwargs)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager._stopped.set()
+
+
+def lease_row(session_factory, store_url):
+    db = session_factory()
+    try:
+        return db.query(StoreLeaseDB).filter(StoreLeaseDB.store_url == store_url).first()
+    finally:
+        db.close()
+
+
+def set_expires_at(session_factory, store_url, expires_at):
+    db = session_factory()
+    try:
+        db.query(StoreLeaseDB).filter(StoreLeaseDB.store_url == store_url).update({StoreLeaseDB.expires_at: expires_at})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_claim_is_exclusive(make_manager):
+    a, b = make_manager("a"), make_manager("b")
+    assert a.claim("https://s.com", include_done=True)
+    assert not b.claim("https://s.com", include_done=True)
+    # Running leases can't be claimed again, not even by their holder
+    assert not a.claim("https://s.com", include_done=True)
+
+
+def test_concurrent_claims_have_one_winner(make_manager):
+    managers = [make_manager(f"node-{i}") for i in range(8)]
+    barrier = threading.Barrier(len(managers))
+    wins = []
+
+    def race(manager):
+        barrier.wait()
+        if manager.claim("https://s.com", include_done=True):
+            wins.append(manager.owner)
+
+    threads = [threading.Thread(target=race, args=(manager,)) for manager in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(wins) == 1
+
+
+def test_claim_without_include_done_needs_a_queued_row(make_manager):
+    a = make_manager("a")
+    assert not a.claim("https://s.com")
+    a.enqueue(["https://s.com"])
+    assert a.claim("https://s.com")
+
+
+def test_complete_then_reclaim_with_include_done(make_manager, session_factory):
+    a, b = make_manager("a"), make_manager("b")
+    assert a.claim("https://s.com", include_done=True)
+    assert a.complete("https://s.com")
+    assert lease_row(session_factory, "https://s.com").status == DONE
+    assert not b.claim("https://s.com")
+    assert b.claim("https://s.com", include_done=True)
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_is_fenced(make_manager, session_factory):
+    a, b = make_manager("a"), make_manager("b")
+    assert a.claim("https://s.com", include_done=True)
+    # a stops heartbeating, e.g. a long GC pause
+    set_expires_at(session_factory, "https://s.com", datetime.utcnow() - timedelta(seconds=1))
+
+    assert b.claim("https://s.com")
+    assert not a.complete("https://s.com")
+    assert a.renew() == []  # complete already forgot the lost lease
+    row = lease_row(session_factory, "https://s.com")
+    assert (row.status, row.owner) == (RUNNING, "b")
+    assert b.complete("https://s.com", success=False)
+    assert lease_row(session_factory, "https://s.com").status == FAILED
+
+
+def test_renew_reports_lost_leases(make_manager, session_factory):
+    a, b = make_manager("a"), make_manager("b")
+    assert a.claim("https://s.com", include_done=True)
+    set_expires_at(session_factory, "https://s.com", datetime.utcnow() - timedelta(seconds=1))
+    assert b.claim("https://s.com")
+
+    assert a.renew() == ["https://s.com"]
+    assert a.held() == []
+    assert b.renew() == []
+
+
+def test_enqueue_skips_queued_running_and_recently_done(make_manager, session_factory):
+    a = make_manager("a")
+    assert a.enqueue(["https://1.com", "https://2.com", "https://1.com"]) == {"queued": 2, "skipped": 0}
+    assert a.enqueue(["https://1.com"]) == {"queued": 0, "skipped": 1}
+
+    assert a.claim("https://1.com")
+    a.complete("https://1.com")
+    assert a.enqueue(["https://1.com"])["queued"] == 0
+
+    set_expires_at(session_factory, "https://1.com", datetime.utcnow() - timedelta(seconds=1))
+    assert a.enqueue(["https://1.com"])["queued"] == 1
+    assert lease_row(session_factory, "https://1.com").status == PENDING
+
+
+def test_claim_pending_splits_the_queue(make_manager):
+    a, b = make_manager("a"), make_manager("b")
+    urls = [f"https://{i}.com" for i in range(10)]
+    a.enqueue(urls)
+
+    first = a.claim_pending(4)
+    second = b.claim_pending(10)
+    assert len(first) == 4
+    assert sorted(first + second) == sorted(urls)
+
+
+def test_stop_requeues_only_queue_leases(make_manager, session_factory):
+    a = make_manager("a")
+    a.enqueue(["https://queued.com"])
+    assert a.claim_pending(1) == ["https://queued.com"]
+    assert a.claim("https://interactive.com", include_done=True)
+
+    a.stop()
+
+    assert lease_row(session_factory, "https://queued.com").status == PENDING
+    interactive = lease_row(session_factory, "https://interactive.com")
+    assert interactive.status == FAILED
+    # Not picked up by batch workers, but free for the next interactive scrape
+    b = make_manager("b")
+    assert b.claim_pending(5) == ["https://queued.com"]
+    assert b.claim("https://interactive.com", include_done=True)
+
+
+def test_hand_back_keeps_queued_store_in_queue(make_manager, session_factory):
+    a = make_manager("a")
+    a.enqueue(["https://queued.com"])
+    # An interactive claim of a queued store still takes it from the queue
+    assert a.claim("https://queued.com", include_done=True)
+    assert a.claim("https://synced.com", include_done=True)
+
+    assert a.hand_back("https://queued.com")
+    assert a.hand_back("https://synced.com")
+
+    assert a.held() == []
+    assert lease_row(session_factory, "https://queued.com").status == PENDING
+    assert lease_row(session_factory, "https://synced.com").status == FAILED
+    assert a.claim_pending(5) == ["https://queued.com"]
+
+
+def test_purge_deletes_only_old_finished_leases(make_manager, session_factory):
+    a = make_manager("a")
+    for url in ("https://old.com", "https://recent.com", "https://running.com"):
+        assert a.claim(url, include_done=True)
+    a.complete("https://old.com")
+    a.complete("https://recent.com")
+    set_expires_at(session_factory, "https://old.com", datetime.utcnow() - timedelta(days=2))
+
+    assert a.purge(older_than=86400) == 1
+    assert lease_row(session_factory, "https://old.com") is None
+    assert lease_row(session_factory, "https://recent.com") is not None
+    assert lease_row(session_factory, "https://running.com") is not None
+
+
+def test_worker_processes_queue_once(make_manager, session_factory):
+    leases = make_manager("worker")
+    urls = [f"https://{i}.com" for i in range(6)]
+    leases.enqueue(urls)
+    processed = []
+    lock = threading.Lock()
+
+    def process(store_url):
+        with lock:
+            processed.append(store_url)
+        return store_url != "https://0.com"
+
+    worker = LeaseWorker(leases, process, concurrency=2, poll_interval=0.05)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while len(processed) < len(urls) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+    finally:
+        worker.stop()
+
+    assert sorted(processed) == sorted(urls)
+    assert lease_row(session_factory, "https://0.com").status == FAILED
+    assert lease_row(session_factory, "https://1.com").status == DONE
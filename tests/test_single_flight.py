@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Counter:
+    """Blocking work that counts its executions and can be held open"""
+
+    def __init__(self, result="done", error=None):
+        self.calls = 0
+        self.release = threading.Event()
+        self.result = result
+        self.error = error
+
+    def __call__(self, *args):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_calls_share_one_execution():
+    async def main():
+        flight = SingleFlight()
+        work = Counter()
+        callers = [asyncio.ensure_future(flight.run("k", work)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        work.release.set()
+        return work, await asyncio.gather(*callers)
+
+    work, results = run(main())
+    assert work.calls == 1
+    assert results == ["done"] * 5
+
+
+def test_different_keys_run_separately():
+    async def main():
+        flight = SingleFlight()
+        work = Counter()
+        work.release.set()
+        await asyncio.gather(flight.run("a", work), flight.run("b", work))
+        return work
+
+    assert run(main()).calls == 2
+
+
+def test_error_reaches_every_caller_and_is_not_memoized():
+    async def main():
+        flight = SingleFlight(memo_seconds=60)
+        failing = Counter(error=RuntimeError("boom"))
+        callers = [asyncio.ensure_future(flight.run("k", failing)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        failing.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        work = Counter()
+        work.release.set()
+        return results, await flight.run("k", work), work
+
+    results, retried, work = run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert (retried, work.calls) == ("done", 1)
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def main():
+        flight = SingleFlight(memo_seconds=60)
+        work = Counter()
+        first = asyncio.ensure_future(flight.run("k", work))
+        second = asyncio.ensure_future(flight.run("k", work))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        work.release.set()
+        result = await second
+        # The finished run is memoized even though its starter went away
+        memoized = await flight.run("k", Counter(result="other"))
+        return first, result, memoized, work
+
+    first, result, memoized, work = run(main())
+    assert first.cancelled()
+    assert (result, memoized, work.calls) == ("done", "done", 1)
+
+
+def test_memo_respects_predicate_and_expiry():
+    async def main():
+        flight = SingleFlight(memo_seconds=0.2)
+        work = Counter(result="bad")
+        work.release.set()
+        await flight.run("k", work, memoize=lambda result: result == "good")
+        await flight.run("k", work, memoize=lambda result: result == "good")
+        rejected_calls = work.calls
+
+        good = Counter(result="good")
+        good.release.set()
+        await flight.run("k", good, memoize=lambda result: result == "good")
+        await flight.run("k", good, memoize=lambda result: result == "good")
+        memoized_calls = good.calls
+
+        await asyncio.sleep(0.25)
+        await flight.run("k", good)
+        return rejected_calls, memoized_calls, good.calls
+
+    assert run(main()) == (2, 1, 2)
+
+
+def test_feed_replays_sections_to_late_followers():
+    def scrape(gate, publish):
+        publish("a", 1)
+        publish("b", 2)
+        gate.wait(5)
+        publish("c", 3)
+        return "result"
+
+    async def follow(flight, task):
+        return [section async for section in flight.feed("k").follow(task)]
+
+    async def main():
+        flight = SingleFlight()
+        gate = threading.Event()
+        first = asyncio.ensure_future(flight.run("k", scrape, gate, feed=True))
+        early = asyncio.ensure_future(follow(flight, first))
+        await asyncio.sleep(0.05)
+
+        # Joins after two sections were published
+        late_task = asyncio.ensure_future(flight.run("k", scrape, gate, feed=True))
+        late = asyncio.ensure_future(follow(flight, late_task))
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await early, await late, await first, await late_task, flight._feeds
+
+    early, late, first, second, feeds = run(main())
+    expected = [("a", 1), ("b", 2), ("c", 3)]
+    assert early == expected
+    assert late == expected
+    assert first == second == "result"
+    assert feeds == {}
+
+
+def test_feed_follow_ends_when_result_is_memoized():
+    async def main():
+        flight = SingleFlight(memo_seconds=60)
+        work = Counter()
+        work.release.set()
+        await flight.run("k", work)
+
+        feed = flight.feed("k")
+        task = asyncio.ensure_future(flight.run("k", work, feed=True))
+        sections = [section async for section in feed.follow(task)]
+        return sections, await task, work.calls
+
+    sections, result, calls = run(main())
+    assert (sections, result, calls) == ([], "done", 1)